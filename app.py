@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, copy_current_request_context, url_for, has_request_context
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 import os
@@ -7,8 +7,12 @@ import json
 from datetime import datetime, timedelta
 from io import BytesIO
 import threading
+import time
 import uuid
 import re
+import socket
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +20,57 @@ load_dotenv()
 # Import database module
 from database import init_database, get_database
 
+# Import pooled HTTP client
+from http_client import get_http_client
+
+# Import Gemini context cache registry
+from gemini_cache import get_gemini_cache
+
+# Import LLM job queue
+from llm_jobs import get_job_queue
+
+# Import LLM scheduler
+from llm_scheduler import get_llm_scheduler, PRIORITY_INTERACTIVE, PRIORITY_DOCIQ, PRIORITY_BATCH
+
+# Import Ollama load balancer
+from ollama_pool import OllamaPool
+
+# Import hedged/failover routing between backends
+from llm_router import RoutedRequest, BackendBusyError, POLICY_SINGLE
+
+# Import response caching
+from caching import TTLCache, make_cache_key
+
+# Import request coalescing
+from single_flight import SingleFlight
+
+# Import search provider health tracking
+from provider_health import get_search_health
+
+# Import rate limiting for search providers
+from rate_limiter import RateLimiterRegistry, parse_rate
+
+# Import deep search page fetching
+from deep_search import get_deep_searcher
+
+# Import search result page parsing
+from search_parsers import get_search_parser
+
+# Import search result merging
+from result_merging import merge_results
+
+# Import search intent classification
+from search_intent import get_search_intent
+
+# Import request stage tracing
+from request_trace import RequestTrace
+
+# Import usage metrics
+from usage_metrics import get_usage_tracker, ollama_usage, gemini_usage
+
+# Import context window management
+from context_window import count_tokens, message_tokens, message_key, fit_to_budget
+
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'default-secret-key-change-in-production')
 app.config['SESSION_TYPE'] = 'filesystem'
@@ -37,8 +92,54 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # GPT/Ollama Configuration
 GPT_SERVER_URL = os.getenv('GPT_SERVER_URL', 'http://localhost:11434/api/chat')
+
+# GPT_SERVER_URL may list several Ollama hosts, separated by commas
+GPT_SERVER_URLS = [url.strip() for url in GPT_SERVER_URL.split(',') if url.strip()]
 GPT_MODEL = os.getenv('GPT_MODEL', 'gpt-oss:120b-cloud')
 
+# How long Ollama keeps the model loaded after a request (e.g. '30m', '-1' = forever)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+
+# Load GPT_MODEL on every Ollama host at startup (and again if a host unloads
+# it) so the first user request doesn't pay the model-load time
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', 'True') == 'True'
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv('OLLAMA_WARMUP_TIMEOUT', '300'))
+
+# Generation profiles per call site: how many tokens each kind of request
+# may generate. A request's Ollama context window (see get_num_ctx) must fit
+# its prompt plus this budget.
+REQUEST_PROFILES = {
+    'chat': {'num_predict': int(os.getenv('NUM_PREDICT_CHAT', '4096'))},
+    'search_summary': {'num_predict': int(os.getenv('NUM_PREDICT_SEARCH_SUMMARY', '768'))},
+    'dociq_answer': {'num_predict': int(os.getenv('NUM_PREDICT_DOCIQ_ANSWER', '1536'))},
+    'dociq_summary': {'num_predict': int(os.getenv('NUM_PREDICT_DOCIQ_SUMMARY', '1024'))},
+    'conversation_summary': {'num_predict': int(os.getenv('NUM_PREDICT_CONVERSATION_SUMMARY', '512'))}
+}
+
+# Headroom for the gap between our token estimate and the model's tokenizer
+NUM_CTX_MARGIN = 256
+
+# Routing between backends: 'single' (selected model only), 'failover'
+# (retry on the other model after an error) or 'hedged' (also race the other
+# model when the first token is slower than LLM_HEDGE_DELAY seconds)
+LLM_ROUTING_POLICY = os.getenv('LLM_ROUTING_POLICY', 'single')
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '8'))
+
+# Cache identical LLM requests (same model, messages and options)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '3600'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', '')
+
+# Batch chat API limits
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+
+# Keep system prompts byte-identical across turns so Ollama can reuse its
+# prompt/KV cache; volatile data (date, search results) goes at the end
+STABLE_PROMPT_PREFIX = os.getenv('STABLE_PROMPT_PREFIX', 'True') == 'True'
+
 # Gemini Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
@@ -50,6 +151,7 @@ if GEMINI_API_KEY:
     try:
         from google import genai
         gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+        get_gemini_cache().set_client(gemini_client)
         GEMINI_AVAILABLE = True
         print("[OK] Gemini client initialized")
     except Exception as e:
@@ -64,23 +166,64 @@ VOICE_ID = os.getenv('VOICE_ID', '21m00Tcm4TlvDq8ikWAM')
 DEFAULT_AI_MODEL = os.getenv('DEFAULT_AI_MODEL', 'gemini' if GEMINI_AVAILABLE else 'gpt')
 
 # Available AI Models
+# context_budget is the maximum number of prompt tokens sent to the model
 AI_MODELS = {
     'gpt': {
         'name': 'AXIO Core',
         'description': 'Local GPT model via Ollama',
-        'available': True
+        'available': True,
+        'context_budget': int(os.getenv('GPT_CONTEXT_BUDGET', '8192'))
     },
     'gemini': {
         'name': 'AXIO Lite',
         'description': 'Perfionix AI',
-        'available': GEMINI_AVAILABLE
+        'available': GEMINI_AVAILABLE,
+        'context_budget': int(os.getenv('GEMINI_CONTEXT_BUDGET', '32768'))
     }
 }
 
+# Ollama context window (num_ctx) shared by GPT requests and the warm-up.
+# Ollama reloads the model whenever num_ctx changes, so requests that fit use
+# this one size; by default it fits a typical chat prompt plus the chat
+# generation budget, rounded up to a multiple of 1024. Requests that don't
+# fit double it until they do, up to what a full prompt budget needs.
+OLLAMA_TYPICAL_PROMPT_TOKENS = int(os.getenv('OLLAMA_TYPICAL_PROMPT_TOKENS', '2048'))
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', '0')) or -(-(
+    OLLAMA_TYPICAL_PROMPT_TOKENS + REQUEST_PROFILES['chat']['num_predict'] + NUM_CTX_MARGIN
+) // 1024) * 1024
+
 # Initialize MongoDB connection
 USE_MONGODB = init_database()
 db = get_database()
 
+# Shared keep-alive HTTP client for outbound LLM, search and TTS calls
+http_client = get_http_client()
+
+# Registry of Gemini context caches for long system prompts
+gemini_cache = get_gemini_cache()
+
+# Background worker pool for long-running LLM requests
+llm_jobs = get_job_queue()
+
+# Priority scheduler with per-backend concurrency limits
+llm_scheduler = get_llm_scheduler()
+
+# Load balancer across the configured Ollama hosts; the GPT concurrency
+# limit applies per host
+ollama_pool = OllamaPool(GPT_SERVER_URLS, http_client)
+llm_scheduler.set_limit('gpt', int(os.getenv('LLM_CONCURRENCY_GPT', '2')) * len(GPT_SERVER_URLS))
+
+# Response cache for identical LLM requests, optionally persisted to disk
+llm_cache = TTLCache('LLM', LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES, disk_dir=LLM_CACHE_DIR)
+
+# Collapse concurrent identical LLM, search and speech requests into one call
+llm_flight = SingleFlight('LLM')
+search_flight = SingleFlight('search')
+speech_flight = SingleFlight('speech')
+
+# Token, speed and cost totals per model and per session
+usage_tracker = get_usage_tracker()
+
 # Fallback in-memory storage (used when MongoDB is not available)
 user_data = {
     'notes': [],
@@ -97,6 +240,22 @@ dociq_single_user_storage = {
     'conversation': []
 }
 
+# Rolling chat summaries (fallback)
+chat_summaries = {}
+
+# Chat conversations saved after the session cookie went out (streamed
+# replies, async jobs), as (version, conversation) per session. Without
+# MongoDB they only reach the next request through here. The cookie carries
+# the version of its own copy, and an entry is dropped once the cookie's
+# copy is as new, so another worker's stale entry can't roll history back.
+# Least recently saved sessions are dropped beyond CHAT_FALLBACK_MAX_SESSIONS.
+chat_conversations = {}
+chat_conversations_lock = threading.Lock()
+CHAT_FALLBACK_MAX_SESSIONS = int(os.getenv('CHAT_FALLBACK_MAX_SESSIONS', '1000'))
+
+# Set while saving after the response (and its cookie) has been sent
+cookie_sent = ContextVar('cookie_sent', default=False)
+
 # VizIQ storage (fallback)
 viziq_storage = {
     'data': None,
@@ -110,9 +269,7 @@ viziq_storage = {
 # AI Chat Functions
 # -------------------------------
 
-def get_system_prompt():
-    """Get the system prompt with current date/time"""
-    return f"""You are Axio by Perfionix AI – a professional coding assistant and programming expert with web search capabilities.
+SYSTEM_PROMPT = """You are Axio by Perfionix AI – a professional coding assistant and programming expert with web search capabilities.
 
 You help developers with:
 - Writing, debugging, and optimizing code
@@ -134,10 +291,28 @@ IMPORTANT FORMATTING RULES:
 - Use inline code with single backticks for variable names, functions, etc.
 - Structure responses with headers, lists, and clear sections
 - Be concise but thorough
-- Include code examples when helpful
+- Include code examples when helpful"""
+
+def get_system_prompt():
+    """Get the system prompt, with the current date/time unless the prefix is kept stable"""
+    if STABLE_PROMPT_PREFIX:
+        return SYSTEM_PROMPT
+    return f"""{SYSTEM_PROMPT}
 
 Current date and time: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}"""
 
+# Date and time added to a prompt by add_volatile_context or get_system_prompt
+VOLATILE_CONTEXT_PATTERN = re.compile(r'\n\n\[?Current date(?: and time)?: (\d{4}-\d{2}-\d{2})[\d: ]*\]?$')
+
+def add_volatile_context(conversation):
+    """Append per-request data to the last user message instead of the system prompt"""
+    if not STABLE_PROMPT_PREFIX or not conversation or conversation[-1].get('role') != 'user':
+        return conversation
+
+    last_msg = dict(conversation[-1])
+    last_msg['content'] = f"{last_msg['content']}\n\n[Current date and time: {datetime.now().strftime('%Y-%m-%d %H:%M')}]"
+    return conversation[:-1] + [last_msg]
+
 
 def get_session_id():
     """Get or create session ID"""
@@ -146,25 +321,55 @@ def get_session_id():
         session.modified = True
     return session['session_id']
 
-def get_conversation():
-    """Get or initialize conversation for current session"""
+def get_conversation(summary=None):
+    """Get or initialize conversation for current session
+
+    From MongoDB, every message not yet folded into the session's rolling
+    summary is loaded; build_context_window then sends the newest turns that
+    fit the token budget and summarizes the rest. Positions in the loaded
+    conversation shift as the summary advances, so stored messages are
+    addressed by their "_id". A summary that was already looked up can be
+    passed in ({} when the session has none).
+    """
     session_id = get_session_id()
 
     # Try to get from MongoDB first
     if USE_MONGODB and db.is_connected():
-        messages = db.get_chat_history(session_id, limit=50)
+        if summary is None:
+            summary = get_chat_summary(session_id) or {}
+        messages = db.get_chat_history(session_id, after_id=summary.get('covered_until'))
         if messages:
             # Convert to conversation format
             conversation = [{"role": "system", "content": get_system_prompt()}]
             for msg in messages:
-                conversation.append({
+                conv_msg = {
                     "role": msg.get("role"),
                     "content": msg.get("content"),
                     "_id": msg.get("id")  # Store MongoDB ID for editing
-                })
+                }
+
+                # Reuse the cached token count, backfilling it for older messages
+                token_count = (msg.get("metadata") or {}).get("token_count")
+                if token_count is None:
+                    token_count = message_tokens(conv_msg)
+                    db.update_chat_message_metadata(msg.get("id"), {"token_count": token_count})
+                conv_msg["_tokens"] = token_count
+
+                conversation.append(conv_msg)
             return conversation
 
-    # Fallback to session storage
+    # Fallback to session storage, unless a later save missed the cookie
+    version = session.get('conversation_version', 0)
+    with chat_conversations_lock:
+        stored = chat_conversations.get(session_id)
+        if stored and stored[0] <= version:
+            del chat_conversations[session_id]
+            stored = None
+    if stored:
+        session['conversation'] = list(stored[1])
+        session['conversation_version'] = stored[0]
+        session.modified = True
+
     if 'conversation' not in session:
         session['conversation'] = [
             {
@@ -186,18 +391,34 @@ def save_conversation(conversation):
             # Check if these are new messages (don't have _id)
             for msg in conversation[-2:]:
                 if msg.get("role") in ["user", "assistant"] and "_id" not in msg:
+                    metadata = {
+                        "searched": msg.get("searched", False),
+                        "token_count": message_tokens(msg)
+                    }
+                    if msg.get("usage"):
+                        metadata["usage"] = msg["usage"]
                     msg_id = db.save_chat_message(
                         session_id=session_id,
                         role=msg["role"],
                         content=msg["content"],
-                        metadata={"searched": msg.get("searched", False)}
+                        metadata=metadata
                     )
                     msg["_id"] = msg_id
 
     # Also save to session as backup
+    version = session.get('conversation_version', 0) + 1
     session['conversation'] = conversation
+    session['conversation_version'] = version
     session.modified = True
 
+    if not (USE_MONGODB and db.is_connected()):
+        with chat_conversations_lock:
+            chat_conversations.pop(session_id, None)
+            if cookie_sent.get():
+                chat_conversations[session_id] = (version, list(conversation))
+                while len(chat_conversations) > CHAT_FALLBACK_MAX_SESSIONS:
+                    chat_conversations.pop(next(iter(chat_conversations)))
+
 def get_current_model():
     """Get the current AI model from session"""
     if 'ai_model' not in session:
@@ -205,6 +426,34 @@ def get_current_model():
         session.modified = True
     return session['ai_model']
 
+def get_context_budget(model=None):
+    """Get the prompt token budget for a model"""
+    current_model = model or get_current_model()
+    return AI_MODELS.get(current_model, AI_MODELS['gpt'])['context_budget']
+
+def build_context_window(conversation, model=None, session_id=None, summary=None):
+    """Trim a conversation to the newest turns that fit the model's token budget
+
+    When a session id is given, turns already folded into the session's rolling
+    summary are replaced by the summary, and turns evicted by this call are
+    handed to a background job that folds them into it. A summary that was
+    already looked up can be passed in ({} when the session has none).
+    """
+    current_model = model or get_current_model()
+    budget = get_context_budget(current_model)
+
+    if summary is None and session_id:
+        summary = get_chat_summary(session_id)
+    if summary:
+        conversation = apply_chat_summary(conversation, summary)
+
+    window, evicted = fit_to_budget(conversation, budget)
+    if evicted:
+        print(f"[Context] Dropped {len(evicted)} older messages to fit {budget} token budget")
+        if session_id:
+            schedule_summary_update(session_id, evicted, current_model)
+    return add_volatile_context(window)
+
 def set_current_model(model):
     """Set the current AI model in session"""
     if model in AI_MODELS and AI_MODELS[model]['available']:
@@ -213,25 +462,115 @@ def set_current_model(model):
         return True
     return False
 
-def generate_gpt_response(conversation):
-    """Generate AI response using GPT/Ollama"""
-    headers = {"Content-Type": "application/json"}
-    payload = {
+def get_num_ctx(needed):
+    """Get the context window for a request needing this many tokens
+
+    The shared OLLAMA_NUM_CTX, or for larger requests the smallest doubling of
+    it that fits, so the few sizes in use keep model reloads rare. Never more
+    than a full prompt budget plus the largest generation budget needs.
+    """
+    largest = AI_MODELS['gpt']['context_budget'] + max(p['num_predict'] for p in REQUEST_PROFILES.values()) + NUM_CTX_MARGIN
+    num_ctx = OLLAMA_NUM_CTX
+    while num_ctx < needed and num_ctx < largest:
+        num_ctx *= 2
+    return num_ctx
+
+def build_gpt_options(conversation, profile='chat'):
+    """Size the generation budget and context window of a request for its profile"""
+    num_predict = REQUEST_PROFILES.get(profile, REQUEST_PROFILES['chat'])['num_predict']
+    prompt_tokens = sum(message_tokens(msg) for msg in conversation)
+
+    return {
+        "num_ctx": get_num_ctx(prompt_tokens + num_predict + NUM_CTX_MARGIN),
+        "num_predict": num_predict,
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "repeat_penalty": 1.1
+    }
+
+def build_gpt_payload(conversation, stream=False, profile='chat'):
+    """Build the Ollama chat request payload"""
+    return {
         "model": GPT_MODEL,
         "messages": conversation,
-        "stream": False,
-        "options": {
-            "num_predict": 4096,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "repeat_penalty": 1.1
-        }
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": build_gpt_options(conversation, profile)
     }
 
+def build_warmup_payload():
+    """Build a one-token request that loads GPT_MODEL and primes the system prompt"""
+    payload = build_gpt_payload([
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": "Hi"}
+    ])
+    # Sized like a short chat request (the shared num_ctx), so the runner it
+    # loads is the one typical requests use
+    payload["options"]["num_predict"] = 1
+    return payload
+
+# Set once this process has started the warm-up
+model_warmup_started = threading.Event()
+model_warmup_lock = threading.Lock()
+
+def start_model_warmup():
+    """Start warming the GPT model on all Ollama hosts in the background, once per process"""
+    if model_warmup_started.is_set() or not OLLAMA_WARMUP or not AI_MODELS['gpt']['available']:
+        return
+    with model_warmup_lock:
+        if model_warmup_started.is_set():
+            return
+        model_warmup_started.set()
+    print(f"[Ollama] Warming up {GPT_MODEL} on {len(ollama_pool.nodes)} host(s)")
+    ollama_pool.enable_warmup(build_warmup_payload(), timeout=OLLAMA_WARMUP_TIMEOUT)
+
+def open_gpt_request(payload, session_key=None, stream=False):
+    """Send a request to the least-loaded healthy Ollama host
+
+    Connection failures are retried on each remaining host. Returns the chosen
+    node and the response; the caller must release the node with
+    ollama_pool.release() once the response has been consumed.
+    """
+    headers = {"Content-Type": "application/json"}
+    attempted = []
+
+    while True:
+        node = ollama_pool.pick(session_key, exclude=attempted)
+        try:
+            response = http_client.post(node.url, headers=headers, json=payload, timeout=300, stream=stream)
+            response.raise_for_status()
+            ollama_pool.report_success(node)
+            return node, response
+        except requests.exceptions.RequestException as e:
+            ollama_pool.release(node)
+            attempted.append(node)
+
+            status_code = e.response.status_code if e.response is not None else None
+            if e.response is None or status_code >= 500:
+                ollama_pool.report_failure(node, e)
+
+            if isinstance(e, requests.exceptions.ConnectionError) and len(attempted) < len(ollama_pool.nodes):
+                print(f"[Ollama] {node.base_url} unreachable, retrying on another host")
+                continue
+            raise
+
+def generate_gpt_response(conversation, session_key=None, usage=None, profile='chat'):
+    """Generate AI response using GPT/Ollama
+
+    If a usage dict is given, it is filled with the token counts and timings
+    Ollama reports.
+    """
+    payload = build_gpt_payload(conversation, profile=profile)
+
     try:
-        response = requests.post(GPT_SERVER_URL, headers=headers, json=payload, timeout=300)
-        response.raise_for_status()
-        data = response.json()
+        node, response = open_gpt_request(payload, session_key)
+        try:
+            data = response.json()
+        finally:
+            ollama_pool.release(node)
+
+        if usage is not None:
+            usage.update(ollama_usage(data))
 
         if "message" in data and "content" in data["message"]:
             return data["message"]["content"]
@@ -242,46 +581,167 @@ def generate_gpt_response(conversation):
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
-def generate_gemini_response(conversation):
-    """Generate AI response using Google Gemini SDK"""
-    if not gemini_client:
-        return "Gemini client not initialized. Please check your GEMINI_API_KEY in .env file."
+def get_response_socket(response):
+    """Get the socket a streaming requests response reads from, if it can be found"""
+    sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+    if sock is None:
+        # urllib3 2 hands the socket over to the http.client response
+        fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+    return sock
+
+def abort_response(response):
+    """Close a streaming HTTP response, waking a read blocked on it in another thread
+
+    Closing alone doesn't interrupt a blocked read; shutting the socket down does.
+    """
+    sock = get_response_socket(response)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
+def iter_gpt_chunks(conversation, session_key=None, usage=None, profile='chat', handle=None):
+    """Yield response chunks from GPT/Ollama, raising on failure
+
+    With a stream handle, closing it from another thread drops the connection
+    (which stops generation on the host) and frees the host right away.
+    """
+    payload = build_gpt_payload(conversation, stream=True, profile=profile)
 
+    node, response = open_gpt_request(payload, session_key, stream=True)
+    release_lock = threading.Lock()
+
+    def release():
+        if release_lock.acquire(blocking=False):
+            ollama_pool.release(node)
+
+    if handle:
+        handle.on_close(lambda: abort_response(response))
+        handle.on_close(release)
     try:
-        # Log which model is being used
-        print(f"[Gemini] Using model: {GEMINI_MODEL}")
+        with response:
+            # Ollama streams one JSON object per line
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+
+                chunk = data.get("message", {}).get("content", "")
+                if chunk:
+                    yield chunk
+
+                if data.get("done"):
+                    # The final line carries the token counts and timings
+                    if usage is not None:
+                        usage.update(ollama_usage(data))
+                    return
+    finally:
+        release()
+
+def format_gpt_error(error):
+    """Turn a GPT/Ollama error into a user-facing message"""
+    if isinstance(error, requests.exceptions.RequestException):
+        return "Connection error: Unable to reach AI server. Please ensure the GPT server is running."
+    return f"An error occurred: {str(error)}"
+
+def stream_gpt_response(conversation, session_key=None, usage=None, profile='chat'):
+    """Stream AI response chunks from GPT/Ollama as they are generated"""
+    try:
+        yield from iter_gpt_chunks(conversation, session_key, usage, profile)
+    except Exception as e:
+        yield format_gpt_error(e)
 
-        # Extract system prompt
-        system_prompt = next((msg['content'] for msg in conversation if msg.get('role') == 'system'), None)
+def build_gemini_request(conversation, use_cache=True):
+    """Convert a conversation into structured Gemini contents and request config
 
-        # Build the conversation content for Gemini
-        # Combine all messages into a single prompt with context
-        prompt_parts = []
+    System messages become the system instruction. When it is long enough it is
+    served from an explicit context cache instead of being resent each turn.
+    Returns the contents, the config and the cache name used (if any).
+    """
+    from google.genai import types
 
-        if system_prompt:
-            prompt_parts.append(f"[System Instructions]\n{system_prompt}\n\n[Conversation]")
+    # Extract system prompt (including any pinned conversation summary)
+    system_instruction = "\n\n".join(msg['content'] for msg in conversation if msg.get('role') == 'system')
 
-        for msg in conversation:
-            role = msg.get('role', '')
-            content = msg.get('content', '')
+    # Gemini uses 'model' for assistant turns; merge consecutive same-role turns
+    contents = []
+    for msg in conversation:
+        role = msg.get('role', '')
+        if role == 'system':
+            continue
 
-            if role == 'system':
-                continue
-            elif role == 'user':
-                prompt_parts.append(f"User: {content}")
-            elif role == 'assistant':
-                prompt_parts.append(f"Assistant: {content}")
+        gemini_role = 'model' if role == 'assistant' else 'user'
+        part = types.Part(text=msg.get('content', ''))
+
+        if contents and contents[-1].role == gemini_role:
+            contents[-1].parts.append(part)
+        else:
+            contents.append(types.Content(role=gemini_role, parts=[part]))
 
-        # Add instruction to continue as assistant
-        prompt_parts.append("Assistant:")
+    cache_name = gemini_cache.get_or_create(GEMINI_MODEL, system_instruction) if use_cache else None
+    if cache_name:
+        config = types.GenerateContentConfig(cached_content=cache_name)
+    elif system_instruction:
+        config = types.GenerateContentConfig(system_instruction=system_instruction)
+    else:
+        config = None
 
-        full_prompt = "\n\n".join(prompt_parts)
+    return contents, config, cache_name
 
-        # Generate response using the SDK
-        response = gemini_client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=full_prompt
-        )
+def is_gemini_cache_error(error_msg):
+    """Check whether an error was caused by an expired or missing context cache"""
+    error_lower = error_msg.lower()
+    return 'cache' in error_lower and ('not found' in error_lower or 'expired' in error_lower or 'permission' in error_lower)
+
+def format_gemini_error(error_msg):
+    """Turn a Gemini API error into a user-facing message"""
+    if "blocked" in error_msg.lower():
+        return "The response was blocked by Gemini's safety filters. Please try rephrasing your question."
+    elif "quota" in error_msg.lower():
+        return "Gemini API quota exceeded. Please try again later."
+    else:
+        return f"An error occurred with Gemini: {error_msg}"
+
+def generate_gemini_response(conversation, usage=None):
+    """Generate AI response using Google Gemini SDK
+
+    If a usage dict is given, it is filled with Gemini's token counts.
+    """
+    if not gemini_client:
+        return "Gemini client not initialized. Please check your GEMINI_API_KEY in .env file."
+
+    try:
+        # Log which model is being used
+        print(f"[Gemini] Using model: {GEMINI_MODEL}")
+
+        contents, config, cache_name = build_gemini_request(conversation)
+
+        try:
+            response = gemini_client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=contents,
+                config=config
+            )
+        except Exception as e:
+            if not cache_name or not is_gemini_cache_error(str(e)):
+                raise
+            # The cache expired server-side; forget it and send the prefix inline
+            gemini_cache.invalidate(cache_name)
+            contents, config, _ = build_gemini_request(conversation, use_cache=False)
+            response = gemini_client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=contents,
+                config=config
+            )
+
+        if usage is not None:
+            usage.update(gemini_usage(getattr(response, 'usage_metadata', None)))
 
         if response and response.text:
             return response.text
@@ -291,102 +751,571 @@ def generate_gemini_response(conversation):
     except Exception as e:
         error_msg = str(e)
         print(f"[ERROR] Gemini API error: {error_msg}")
+        return format_gemini_error(error_msg)
 
-        if "blocked" in error_msg.lower():
-            return "The response was blocked by Gemini's safety filters. Please try rephrasing your question."
-        elif "quota" in error_msg.lower():
-            return "Gemini API quota exceeded. Please try again later."
-        else:
-            return f"An error occurred with Gemini: {error_msg}"
+def iter_gemini_chunks(conversation, usage=None):
+    """Yield response chunks from Google Gemini SDK, raising on failure"""
+    if not gemini_client:
+        raise RuntimeError("Gemini client not initialized. Please check your GEMINI_API_KEY in .env file.")
 
-def generate_ai_response(conversation, model=None):
-    """Generate AI response from conversation history using selected model"""
+    print(f"[Gemini] Streaming with model: {GEMINI_MODEL}")
+
+    def relay(contents, config):
+        for chunk in gemini_client.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=contents,
+            config=config
+        ):
+            # Usage metadata is cumulative; the last chunk has the totals
+            if usage is not None and getattr(chunk, 'usage_metadata', None):
+                usage.update(gemini_usage(chunk.usage_metadata))
+            if chunk and chunk.text:
+                yield chunk.text
+
+    contents, config, cache_name = build_gemini_request(conversation)
+
+    produced = False
+    try:
+        for text in relay(contents, config):
+            produced = True
+            yield text
+    except Exception as e:
+        if produced or not cache_name or not is_gemini_cache_error(str(e)):
+            raise
+        # The cache expired server-side; forget it and send the prefix inline
+        gemini_cache.invalidate(cache_name)
+        contents, config, _ = build_gemini_request(conversation, use_cache=False)
+        yield from relay(contents, config)
+
+def stream_gemini_response(conversation, usage=None):
+    """Stream AI response chunks from Google Gemini SDK"""
+    if not gemini_client:
+        yield "Gemini client not initialized. Please check your GEMINI_API_KEY in .env file."
+        return
+
+    produced = False
+    try:
+        for chunk in iter_gemini_chunks(conversation, usage):
+            produced = True
+            yield chunk
+
+        if not produced:
+            yield "Sorry, I couldn't generate a response with Gemini."
+
+    except Exception as e:
+        error_msg = str(e)
+        print(f"[ERROR] Gemini API error: {error_msg}")
+        yield format_gemini_error(error_msg)
+
+BUSY_MESSAGE = "The AI server is busy right now. Please try again in a moment."
+
+def get_scheduler_session_key(session_key=None):
+    """Get the key used for per-session fairness in the LLM scheduler"""
+    if session_key:
+        return session_key
+    if has_request_context():
+        return get_session_id()
+    return None
+
+def get_fallback_model(model):
+    """Get another available model to hedge or fail over to, if any"""
+    for model_id, model_data in AI_MODELS.items():
+        if model_id != model and model_data['available']:
+            return model_id
+    return None
+
+def format_model_error(model, error):
+    """Turn a backend error into a user-facing message"""
+    if model == 'gemini':
+        print(f"[ERROR] Gemini API error: {error}")
+        return format_gemini_error(str(error))
+    return format_gpt_error(error)
+
+def build_routed_request(conversation, model, fallback, priority, scheduler_key, usages=None, profile='chat'):
+    """Create a hedged/failover request between a model and its fallback
+
+    If a usages dict is given, each model's token counts are collected in
+    usages[model].
+    """
+    usages = {} if usages is None else usages
+
+    def open_stream(target_model, handle):
+        usage = usages.setdefault(target_model, {})
+        if target_model == 'gemini':
+            # The SDK stream can't be aborted from another thread; it stops at the next chunk
+            return iter_gemini_chunks(conversation, usage)
+        return iter_gpt_chunks(conversation, scheduler_key, usage, profile, handle)
+
+    def acquire(target_model, blocking):
+        # A hedge only goes out if the other backend has a free slot right now
+        return llm_scheduler.acquire(target_model, priority, scheduler_key, timeout=None if blocking else 0)
+
+    return RoutedRequest(
+        model,
+        fallback,
+        open_stream,
+        acquire,
+        llm_scheduler.release,
+        policy=LLM_ROUTING_POLICY,
+        hedge_delay=LLM_HEDGE_DELAY
+    )
+
+# Replies that report a failure rather than answer the prompt
+ERROR_RESPONSES = frozenset([
+    BUSY_MESSAGE,
+    "Sorry, I couldn't process that request.",
+    "Sorry, I couldn't generate a response with Gemini.",
+    "Connection error: Unable to reach AI server. Please ensure the GPT server is running.",
+    "Gemini client not initialized. Please check your GEMINI_API_KEY in .env file.",
+    "Gemini API quota exceeded. Please try again later.",
+    "The response was blocked by Gemini's safety filters. Please try rephrasing your question."
+])
+
+# Failure replies that end with the error's details
+ERROR_RESPONSE_PREFIXES = ("An error occurred: ", "An error occurred with Gemini: ")
+
+def is_error_response(text):
+    """Check whether a generated reply is an error message"""
+    return not text or text in ERROR_RESPONSES or text.startswith(ERROR_RESPONSE_PREFIXES)
+
+def get_llm_cache_key(conversation, model, profile='chat'):
+    """Build the response cache key for a request
+
+    Message content is whitespace-normalized, so prompts that differ only in
+    spacing share an entry. The time stamped onto the prompt is left out and
+    only its date kept, so the key doesn't change every minute. The backend
+    model name and generation options are part of the key, so changing
+    either doesn't serve stale replies.
+    """
+    if model == 'gemini':
+        backend = {"model": GEMINI_MODEL}
+    else:
+        backend = {"model": GPT_MODEL, "options": build_gpt_options(conversation, profile)}
+
+    messages = []
+    dates = []
+    for msg in conversation:
+        content = str(msg.get("content", ""))
+        match = VOLATILE_CONTEXT_PATTERN.search(content)
+        if match:
+            dates.append(match.group(1))
+            content = content[:match.start()]
+        messages.append({"role": msg.get("role"), "content": " ".join(content.split())})
+    return make_cache_key(model, backend, messages, dates)
+
+def get_answer_cache_key(cache_key, conversation, model, usage, profile='chat'):
+    """Get the cache key a reply is stored under: the fallback model's own key when it answered instead"""
+    answered_by = usage.get('answered_by') or model
+    if answered_by == model:
+        return cache_key
+    return get_llm_cache_key(conversation, answered_by, profile)
+
+def record_usage(usage, model, started, session_key):
+    """Finalize a call's usage metrics and add them to the running totals"""
+    model = usage.pop('answered_by', None) or model
+    backend_model = GEMINI_MODEL if model == 'gemini' else GPT_MODEL
+    usage_tracker.finalize(usage, model, backend_model, time.time() - started)
+    usage_tracker.record(session_key, usage)
+    return usage
+
+def generate_ai_response(conversation, model=None, priority=PRIORITY_INTERACTIVE, session_key=None,
+                         use_cache=True, usage=None, profile='chat'):
+    """Generate AI response from conversation history using selected model
+
+    Identical requests are answered from the response cache, and concurrent
+    identical requests share one backend call. Otherwise the call waits for a
+    slot on the backend; interactive chat is admitted before DocIQ questions,
+    which are admitted before summaries and batch work. With a hedged or
+    failover routing policy, a slow or failing model is backed up by the
+    other available model.
+
+    If a usage dict is given, it is filled with the call's token counts,
+    timings and cost. The profile (see REQUEST_PROFILES) sets the generation
+    budget; GPT requests use the shared context window unless their prompt
+    plus that budget doesn't fit (see get_num_ctx).
+    """
     # Use specified model or get current model from session
     current_model = model or get_current_model()
+    scheduler_key = get_scheduler_session_key(session_key)
+    started = time.time()
 
-    if current_model == 'gemini':
-        return generate_gemini_response(conversation)
+    use_cache = use_cache and LLM_CACHE_ENABLED
+    cache_key = get_llm_cache_key(conversation, current_model, profile)
+
+    response = llm_cache.get(cache_key) if use_cache else None
+    if response is not None:
+        call_usage = {"cache_hit": True}
     else:
-        return generate_gpt_response(conversation)
+        leader = []
+
+        def fetch():
+            leader.append(True)
+            backend_usage = {}
+            response = generate_uncached_ai_response(conversation, current_model, priority, scheduler_key,
+                                                     backend_usage, profile)
+            if use_cache and not is_error_response(response):
+                llm_cache.set(get_answer_cache_key(cache_key, conversation, current_model, backend_usage, profile), response)
+            return response, backend_usage
+
+        # The key covers the whole conversation, so only truly identical requests
+        # (e.g. the same search summary) are coalesced; they run at the leader's priority
+        response, backend_usage = llm_flight.do(cache_key, fetch)
+        call_usage = dict(backend_usage) if leader else {"coalesced": True}
+
+    if not is_error_response(response):
+        record_usage(call_usage, current_model, started, scheduler_key)
+        if usage is not None:
+            usage.update(call_usage)
+    return response
+
+def generate_uncached_ai_response(conversation, current_model, priority=PRIORITY_INTERACTIVE, session_key=None,
+                                  usage=None, profile='chat'):
+    """Generate AI response on the backend, bypassing the response cache"""
+    scheduler_key = get_scheduler_session_key(session_key)
+    usage = {} if usage is None else usage
+
+    fallback = get_fallback_model(current_model) if LLM_ROUTING_POLICY != POLICY_SINGLE else None
+    if fallback:
+        usages = {}
+        routed = build_routed_request(conversation, current_model, fallback, priority, scheduler_key, usages, profile)
+        try:
+            answered_by, text = routed.result()
+            usage.update(usages.get(answered_by, {}), answered_by=answered_by)
+            return text or "Sorry, I couldn't process that request."
+        except BackendBusyError:
+            return BUSY_MESSAGE
+        except Exception as e:
+            return format_model_error(current_model, e)
 
-def should_search_web(message: str) -> bool:
-    """Determine if the message requires a web search"""
-    message_lower = message.lower()
-
-    # Keywords that indicate a search is needed
-    search_keywords = [
-        'search', 'google', 'find', 'look up', 'lookup', 'what is', 'who is',
-        'when did', 'where is', 'how to', 'latest', 'recent', 'news', 'current',
-        'today', 'update', 'trending', '2024', '2025', 'price', 'weather',
-        'definition', 'meaning', 'explain what', 'tell me about', 'information about',
-        'search for', 'search the web', 'web search', 'online', 'internet'
-    ]
+    with llm_scheduler.slot(current_model, priority, scheduler_key) as granted:
+        if not granted:
+            return BUSY_MESSAGE
 
-    # Check for search indicators
-    for keyword in search_keywords:
-        if keyword in message_lower:
-            return True
+        if current_model == 'gemini':
+            return generate_gemini_response(conversation, usage)
+        else:
+            return generate_gpt_response(conversation, scheduler_key, usage, profile)
 
-    # Check for question patterns that might need current info
-    question_patterns = ['what is the', 'who is the', 'when is', 'where is the', 'how do i', 'how can i']
-    for pattern in question_patterns:
-        if message_lower.startswith(pattern):
-            return True
+def stream_ai_response(conversation, model=None, priority=PRIORITY_INTERACTIVE, session_key=None,
+                       use_cache=True, usage=None, profile='chat'):
+    """Stream AI response chunks from conversation history using selected model
 
-    return False
+    A cached reply is sent as a single chunk; a completed stream is added to
+    the response cache. If a usage dict is given, it is filled once the
+    stream completes.
+    """
+    current_model = model or get_current_model()
+    cache_key = get_llm_cache_key(conversation, current_model, profile) if use_cache and LLM_CACHE_ENABLED else None
+    scheduler_key = get_scheduler_session_key(session_key)
+    fallback = get_fallback_model(current_model) if LLM_ROUTING_POLICY != POLICY_SINGLE else None
+
+    def generate_routed(call_usage):
+        usages = {}
+        routed = build_routed_request(conversation, current_model, fallback, priority, scheduler_key, usages, profile)
+        answered_by = current_model
+        try:
+            for answered_by, chunk in routed.stream():
+                yield chunk
+            call_usage.update(usages.get(answered_by, {}), answered_by=answered_by)
+        except BackendBusyError:
+            yield BUSY_MESSAGE
+        except Exception as e:
+            yield format_model_error(answered_by, e)
 
+    def generate(call_usage):
+        # The slot is held until the stream finishes or the client disconnects
+        with llm_scheduler.slot(current_model, priority, scheduler_key) as granted:
+            if not granted:
+                yield BUSY_MESSAGE
+                return
 
-def chat_with_ai(user_message: str, force_search: bool = False):
-    """Send message to AI and get response, with optional web search"""
-    conversation = get_conversation()
+            if current_model == 'gemini':
+                yield from stream_gemini_response(conversation, call_usage)
+            else:
+                yield from stream_gpt_response(conversation, scheduler_key, call_usage, profile)
+
+    def generate_tracked():
+        started = time.time()
+
+        cached = llm_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            call_usage = record_usage({"cache_hit": True}, current_model, started, scheduler_key)
+            if usage is not None:
+                usage.update(call_usage)
+            yield cached
+            return
+
+        call_usage = {}
+        parts = []
+        for chunk in (generate_routed(call_usage) if fallback else generate(call_usage)):
+            parts.append(chunk)
+            yield chunk
+
+        # Only reached when the client read the whole stream; errors arrive
+        # as the final chunk, possibly after part of an answer
+        if parts and not is_error_response(parts[-1]) and not is_error_response(parts[0]):
+            if cache_key:
+                llm_cache.set(get_answer_cache_key(cache_key, conversation, current_model, call_usage, profile), "".join(parts))
+            record_usage(call_usage, current_model, started, scheduler_key)
+            if usage is not None:
+                usage.update(call_usage)
+
+    return generate_tracked()
+
+# -------------------------------
+# Conversation Summary Functions
+# -------------------------------
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and Axio, a coding assistant.
+Update the existing summary with the new messages below. Keep the facts, decisions, code names, file names,
+requirements and user preferences needed to continue the conversation. Drop pleasantries and repeated detail.
+Reply with the updated summary only, in under 300 words."""
+
+# Summary jobs run off the request thread; one job per session at a time
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+summary_lock = threading.Lock()
+summary_jobs_in_flight = set()
+
+# Bumped whenever a session's summary is invalidated so in-flight jobs
+# started from the old history don't write a stale summary back
+summary_generations = {}
+
+# Most evicted-message tokens folded in by one summary job. A longer backlog
+# (e.g. history stored before summaries existed) is folded oldest first over
+# the following turns.
+SUMMARY_BATCH_TOKENS = int(os.getenv('SUMMARY_BATCH_TOKENS', '6000'))
+
+def get_chat_summary(session_id):
+    """Get the rolling summary for a chat session"""
+    if USE_MONGODB and db.is_connected():
+        return db.get_chat_summary(session_id)
+    return chat_summaries.get(session_id)
+
+def save_chat_summary(session_id, summary, covered_until):
+    """Save the rolling summary for a chat session"""
+    token_count = count_tokens(summary)
+    if USE_MONGODB and db.is_connected():
+        db.save_chat_summary(session_id, summary, covered_until, token_count)
+    else:
+        chat_summaries[session_id] = {
+            'session_id': session_id,
+            'summary': summary,
+            'covered_until': covered_until,
+            'token_count': token_count,
+            'updated_at': datetime.now().isoformat()
+        }
+
+def invalidate_chat_summary(session_id):
+    """Discard the rolling summary for a chat session"""
+    with summary_lock:
+        summary_generations[session_id] = summary_generations.get(session_id, 0) + 1
+
+    if USE_MONGODB and db.is_connected():
+        db.clear_chat_summary(session_id)
+    chat_summaries.pop(session_id, None)
+
+def find_summary_boundary(conversation, summary):
+    """Get the index of the last message covered by the summary, or -1"""
+    covered_until = summary.get('covered_until')
+    for i in range(len(conversation) - 1, -1, -1):
+        if conversation[i].get('role') != 'system' and message_key(conversation[i]) == covered_until:
+            return i
+    return -1
+
+def apply_chat_summary(conversation, summary):
+    """Replace the turns covered by the summary with a pinned summary message"""
+    boundary = find_summary_boundary(conversation, summary)
+    system_messages = [msg for msg in conversation if msg.get('role') == 'system']
+    remaining = [msg for msg in conversation[boundary + 1:] if msg.get('role') != 'system']
+
+    summary_message = {
+        'role': 'system',
+        'content': f"Summary of the earlier conversation:\n{summary['summary']}"
+    }
+    return system_messages + [summary_message] + remaining
+
+def schedule_summary_update(session_id, evicted, model):
+    """Fold newly evicted turns into the session summary in the background"""
+    with summary_lock:
+        if session_id in summary_jobs_in_flight:
+            return
+        summary_jobs_in_flight.add(session_id)
+        generation = summary_generations.get(session_id, 0)
+
+    batch = []
+    tokens = 0
+    for msg in evicted:
+        tokens += message_tokens(msg)
+        if batch and tokens > SUMMARY_BATCH_TOKENS:
+            break
+        batch.append(msg)
+
+    # Copy what the job needs; the request's message dicts may change later
+    evicted = [{'role': msg.get('role'), 'content': msg.get('content', ''), 'key': message_key(msg)} for msg in batch]
+    summary_executor.submit(update_chat_summary, session_id, evicted, model, generation)
+
+def update_chat_summary(session_id, evicted, model, generation):
+    """Generate the new summary from the old summary plus evicted turns"""
+    try:
+        previous = get_chat_summary(session_id)
+        previous_text = previous['summary'] if previous else "(no summary yet)"
+
+        transcript = "\n\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in evicted)
+        summary_conversation = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{previous_text}\n\nNew messages:\n{transcript}"}
+        ]
+
+        summary = generate_ai_response(summary_conversation, model=model, priority=PRIORITY_BATCH,
+                                       session_key=session_id, profile='conversation_summary')
+        if is_error_response(summary):
+            print(f"[Summary] Skipped update for session {session_id}: {summary[:80] if summary else 'empty'}")
+            return
+
+        with summary_lock:
+            if summary_generations.get(session_id, 0) != generation:
+                print(f"[Summary] Discarded stale summary for session {session_id}")
+                return
+            save_chat_summary(session_id, summary.strip(), evicted[-1]['key'])
+
+        print(f"[Summary] Folded {len(evicted)} messages into summary for session {session_id}")
+
+    except Exception as e:
+        print(f"[ERROR] Summary update failed: {e}")
+    finally:
+        with summary_lock:
+            summary_jobs_in_flight.discard(session_id)
+
+def should_search_web(message: str) -> bool:
+    """Determine if the message requires a web search (see search_intent for the rules)"""
+    return search_intent.classify(message)['search']
+
+
+def build_search_context(search_results, passages=None):
+    """Format web search results, and any passages fetched from their pages, for the user prompt"""
+    passages = passages or {}
+    search_context = "\n\n📊 **Web Search Results:**\n\n"
+    for i, result in enumerate(search_results, 1):
+        search_context += f"**{i}. {result.get('title', 'No title')}**\n"
+        if result.get('snippet'):
+            search_context += f"{result['snippet']}\n"
+        for passage in passages.get(result.get('link'), []):
+            search_context += f"> {passage}\n"
+        if result.get('link'):
+            search_context += f"🔗 {result['link']}\n"
+        search_context += "\n"
+    return search_context
+
+def run_chat_search(user_message, deep_search):
+    """Search the web for a chat message; returns the results and any deep search passages"""
+    print(f"Performing web search for: {user_message}")
+    search_results = web_search(user_message)
+    print(f"Search results: {len(search_results) if search_results else 0} results found")
+    passages = None
+    if search_results and deep_search:
+        passages = deep_searcher.find_passages(user_message, search_results)
+    return search_results, passages
+
+def prepare_chat_turn(user_message: str, force_search: bool = False, deep_search=None, trace=None):
+    """Run web search if needed and append the user message to the conversation
+
+    Returns the stored conversation, the conversation to send to the model
+    (with search results inlined into the last user message), the index of the
+    user message and whether a search was performed. With deep search (on by
+    default when DEEP_SEARCH is set) the top result pages are fetched and
+    their most relevant passages are inlined as well.
+
+    The search only needs the message, so it starts first and runs in the
+    background while this thread looks up the rolling summary and loads and
+    counts the history. Stages are timed on the trace, if given.
+    """
+    trace = trace or RequestTrace('chat')
+    session_id = get_session_id()
+    if deep_search is None:
+        deep_search = DEEP_SEARCH
 
     # Check if we should perform a web search
+    with trace.span('search_decision'):
+        searching = force_search or should_search_web(user_message)
+    search_future = None
+    if searching:
+        search_future = chat_prep_executor.submit(trace.wrap('search', run_chat_search), user_message, deep_search)
+
+    # The lookup is quick, so it stays on this thread rather than queueing
+    # behind searches for a chat_prep_executor worker
+    with trace.span('summary'):
+        summary = get_chat_summary(session_id) or {}
+    with trace.span('history'):
+        conversation = get_conversation(summary)
+    with trace.span('token_count'):
+        for msg in conversation:
+            message_tokens(msg)
+
     search_results = None
-    if force_search or should_search_web(user_message):
-        print(f"Performing web search for: {user_message}")
-        search_results = web_search(user_message)
-        print(f"Search results: {len(search_results) if search_results else 0} results found")
-
-    # Build the user message with search results if available
-    if search_results:
-        search_context = "\n\n📊 **Web Search Results:**\n\n"
-        for i, result in enumerate(search_results, 1):
-            search_context += f"**{i}. {result.get('title', 'No title')}**\n"
-            if result.get('snippet'):
-                search_context += f"{result['snippet']}\n"
-            if result.get('link'):
-                search_context += f"🔗 {result['link']}\n"
-            search_context += "\n"
+    passages = None
+    if search_future:
+        with trace.span('search_wait', waiting=True):
+            try:
+                search_results, passages = search_future.result()
+            except Exception as e:
+                print(f"[SEARCH] Search failed, answering without it: {e}")
 
-        enhanced_message = f"{user_message}\n{search_context}\nPlease use the above search results to provide an accurate and helpful response. Cite sources when relevant."
-    else:
-        enhanced_message = user_message
+    with trace.span('prompt'):
+        # Build the user message with search results if available
+        if search_results:
+            search_context = build_search_context(search_results, passages)
+            enhanced_message = f"{user_message}\n{search_context}\nPlease use the above search results to provide an accurate and helpful response. Cite sources when relevant."
+        else:
+            enhanced_message = user_message
 
-    # Add user message (original, not enhanced)
-    user_msg_obj = {"role": "user", "content": user_message}
-    conversation.append(user_msg_obj)
-    user_index = len(conversation) - 1
+        # Add user message (original, not enhanced)
+        user_msg_obj = {"role": "user", "content": user_message}
+        conversation.append(user_msg_obj)
+        user_index = len(conversation) - 1
 
-    # Create a temporary conversation with enhanced message for AI
-    temp_conversation = conversation.copy()
-    temp_conversation[-1] = {"role": "user", "content": enhanced_message}
+        # Create a temporary conversation with enhanced message for AI,
+        # trimmed to the model's context budget
+        temp_conversation = conversation.copy()
+        temp_conversation[-1] = {"role": "user", "content": enhanced_message}
+        temp_conversation = build_context_window(temp_conversation, session_id=session_id, summary=summary)
+
+    return conversation, temp_conversation, user_index, bool(search_results)
+
+def chat_with_ai(user_message: str, force_search: bool = False, deep_search=None, trace=None):
+    """Send message to AI and get response, with optional web search
+
+    Returns the response, the positions of the user and AI messages, their
+    stored ids (None without MongoDB) and whether a search was performed.
+    """
+    trace = trace or RequestTrace('chat')
+    conversation, temp_conversation, user_index, searched = prepare_chat_turn(user_message, force_search, deep_search, trace)
 
     # Get AI response
-    ai_response_text = generate_ai_response(temp_conversation)
+    usage = {}
+    with trace.span('llm'):
+        ai_response_text = generate_ai_response(temp_conversation, usage=usage, profile='chat')
 
-    # Add AI response
+    # Add AI response, with token counts and timings for the usage views
     ai_msg_obj = {"role": "assistant", "content": ai_response_text}
+    if usage:
+        ai_msg_obj["usage"] = usage
     conversation.append(ai_msg_obj)
     ai_index = len(conversation) - 1
 
-    save_conversation(conversation)
-    return ai_response_text, user_index, ai_index, bool(search_results)
+    with trace.span('save'):
+        save_conversation(conversation)
+    message_ids = (conversation[user_index].get('_id'), ai_msg_obj.get('_id'))
+    return ai_response_text, user_index, ai_index, message_ids, searched
 
 def generate_speech(text):
-    """Generate speech using ElevenLabs API"""
+    """Generate speech using ElevenLabs API, sharing concurrent requests for the same text"""
     if not ELEVENLABS_API_KEY:
         return None
-        
+
+    return speech_flight.do(make_cache_key(VOICE_ID, text), fetch_speech, text)
+
+def fetch_speech(text):
+    """Request speech audio for text from ElevenLabs"""
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
     headers = {
         "xi-api-key": ELEVENLABS_API_KEY,
@@ -402,7 +1331,7 @@ def generate_speech(text):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = http_client.post(url, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
         return response.content
     except:
@@ -416,37 +1345,276 @@ def generate_speech(text):
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
 GOOGLE_CSE_ID = os.getenv('GOOGLE_CSE_ID', '')
 
+# How providers are queried: 'sequential' (one after another), 'race' (all at
+# once, first acceptable result set wins) or 'merge' (all at once, results
+# combined at the deadline)
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'race')
+SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', '8'))
+SEARCH_MIN_RESULTS = int(os.getenv('SEARCH_MIN_RESULTS', '3'))
+
+# Results kept after merging, and how many SimHash bits two title+snippet
+# texts may differ by and still count as the same article
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '5'))
+SEARCH_DUPLICATE_DISTANCE = int(os.getenv('SEARCH_DUPLICATE_DISTANCE', '10'))
+
+# Search result cache. Entries live for a TTL that depends on how quickly the
+# answer to the query changes.
+SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'True') == 'True'
+SEARCH_CACHE_MAX_BYTES = int(os.getenv('SEARCH_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+SEARCH_CACHE_DIR = os.getenv('SEARCH_CACHE_DIR', '')
+SEARCH_CACHE_TTLS = {
+    'realtime': int(os.getenv('SEARCH_CACHE_TTL_REALTIME', '300')),
+    'recent': int(os.getenv('SEARCH_CACHE_TTL_RECENT', '3600')),
+    'general': int(os.getenv('SEARCH_CACHE_TTL_GENERAL', '21600')),
+    'reference': int(os.getenv('SEARCH_CACHE_TTL_REFERENCE', '604800'))
+}
+
+# Query classes, checked in order; the first that matches sets the TTL
+SEARCH_QUERY_CLASSES = [
+    ('realtime', re.compile(r'\b(news|today|tonight|now|live|current|currently|price|prices|stock|stocks|weather|score|scores|breaking)\b')),
+    ('recent', re.compile(r'\b(latest|recent|recently|new|newest|update|updates|trending|release|released|this (week|month|year)|20\d\d)\b')),
+    ('reference', re.compile(r'\b(definition|define|meaning|what is|what are|who was|explain|how to|history of|difference between)\b'))
+]
+
+search_cache = TTLCache('search', SEARCH_CACHE_TTLS['general'], SEARCH_CACHE_MAX_BYTES, disk_dir=SEARCH_CACHE_DIR)
+
+# Success rate, latency and circuit breaker state per search provider
+search_health = get_search_health()
+
+# Request budget per search provider as 'requests per second:burst'. A provider
+# that is out of budget is skipped rather than waited for; only when no
+# provider has budget does a search wait, up to SEARCH_RATE_MAX_WAIT seconds.
+SEARCH_RATE_LIMITS = {
+    "Google Custom Search API": parse_rate(os.getenv('SEARCH_RATE_GOOGLE_API', '5:10')),
+    "DuckDuckGo": parse_rate(os.getenv('SEARCH_RATE_DUCKDUCKGO', '1:5')),
+    "googlesearch-python": parse_rate(os.getenv('SEARCH_RATE_GOOGLESEARCH', '0.5:2')),
+    "Google scrape": parse_rate(os.getenv('SEARCH_RATE_GOOGLE_SCRAPE', '0.3:1'))
+}
+SEARCH_RATE_MAX_WAIT = float(os.getenv('SEARCH_RATE_MAX_WAIT', '3'))
+search_rate_limiter = RateLimiterRegistry(SEARCH_RATE_LIMITS)
+
+# Provider calls that lose a race finish in the background (bounded by their
+# own timeouts), so the pool is sized for a few concurrent searches
+search_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SEARCH_WORKERS', '16')),
+                                     thread_name_prefix='web-search')
+
+# Result page parser for the scraping providers (SEARCH_PARSER picks the backend)
+search_parser = get_search_parser()
+
+# Weighted rules deciding whether a chat message needs a search
+search_intent = get_search_intent()
+
+# Chat turn web searches, run beside the request thread
+chat_prep_executor = ThreadPoolExecutor(max_workers=int(os.getenv('CHAT_PREP_WORKERS', '16')),
+                                        thread_name_prefix='chat-prep')
+
+# Deep search: fetch the top result pages and add their most relevant passages
+# to the prompt. DEEP_SEARCH sets the default; requests can override it with
+# "deep_search".
+DEEP_SEARCH = os.getenv('DEEP_SEARCH', 'False') == 'True'
+deep_searcher = get_deep_searcher()
+
+def normalize_search_query(query):
+    """Normalize a query for matching identical searches"""
+    return " ".join(query.lower().split())
+
+def classify_search_query(query):
+    """Get the cache class of a normalized query"""
+    for name, pattern in SEARCH_QUERY_CLASSES:
+        if pattern.search(query):
+            return name
+    return 'general'
+
 def web_search(query):
-    """Perform web search - tries multiple methods"""
-    print(f"[SEARCH] Starting web search for: {query}")
+    """Perform web search, answering from the result cache when possible
+
+    Concurrent identical queries share one provider chain.
+    """
+    key = normalize_search_query(query)
+
+    if SEARCH_CACHE_ENABLED:
+        cached = search_cache.get(key)
+        if cached is not None:
+            print(f"[SEARCH] Cache hit for: {query}")
+            return cached
+
+    def fetch():
+        results = search_providers(query)
+        # Empty result sets usually mean the providers were failing; don't keep them
+        if SEARCH_CACHE_ENABLED and results:
+            search_cache.set(key, results, ttl=SEARCH_CACHE_TTLS[classify_search_query(key)])
+        return results
+
+    return search_flight.do(key, fetch)
+
+def get_search_providers():
+    """Get the search providers to call now as (name, function), healthiest first
+
+    Providers whose circuit breaker is open are skipped until their cooldown
+    has passed.
+    """
+    providers = []
 
-    # Method 1: Try Google Custom Search API (most reliable if configured)
+    # Google Custom Search API (most reliable if configured)
     if GOOGLE_API_KEY and GOOGLE_CSE_ID:
-        results = web_search_google_api(query)
+        providers.append(("Google Custom Search API", web_search_google_api))
+
+    providers += [
+        ("DuckDuckGo", web_search_duckduckgo),
+        ("googlesearch-python", web_search_googlesearch),
+        ("Google scrape", web_search_google_scrape)
+    ]
+
+    functions = dict(providers)
+    return [(name, functions[name]) for name in search_health.select([name for name, _ in providers])]
+
+def wait_for_search_budget(providers, max_wait):
+    """Wait for the provider whose rate limit frees up first; None if none does in time"""
+    if not providers:
+        return None
+    name, provider = min(providers, key=lambda entry: search_rate_limiter.wait_time(entry[0]))
+    print(f"[SEARCH] All providers are rate limited, waiting for {name}")
+    if search_rate_limiter.acquire(name, max_wait):
+        return name, provider
+    return None
+
+def reserve_search_budget(providers, max_wait):
+    """Take a rate limit token for every provider that has budget left
+
+    Providers without budget are skipped. If none has budget, waits for the
+    one that frees up first.
+    """
+    granted = []
+    for name, provider in providers:
+        if search_rate_limiter.try_acquire(name):
+            granted.append((name, provider))
+        else:
+            print(f"[SEARCH] {name} is rate limited, skipping")
+            search_health.cancel(name)
+
+    if not granted:
+        entry = wait_for_search_budget(providers, max_wait)
+        if entry:
+            granted.append(entry)
+    return granted
+
+def call_search_provider(name, provider, query):
+    """Call one search provider and record the outcome in its health state
+
+    Providers report failures by returning None, so an empty result counts
+    as a failure: a blocked scraper usually gets a page with no results.
+    """
+    started = time.time()
+    results = None
+    error = None
+    try:
+        results = provider(query)
+    except Exception as e:
+        error = e
+        print(f"{name} error: {e}")
+    finally:
+        search_health.record(name, bool(results), time.time() - started, error)
+    return results
+
+def search_providers(query):
+    """Perform web search - tries multiple methods"""
+    print(f"[SEARCH] Starting web search for: {query} ({SEARCH_MODE})")
+
+    if SEARCH_MODE == 'sequential':
+        results = search_sequential(query)
+    else:
+        results = search_fan_out(query, merge=SEARCH_MODE == 'merge')
+
+    # A single provider's list still gets clean links and repeats removed
+    if results and SEARCH_MODE != 'merge':
+        results = merge_search_results([results])
+
+    if not results:
+        print("[ERROR] All search methods failed")
+    return results or []
+
+def search_sequential(query):
+    """Try each provider in order until one returns results"""
+    providers = get_search_providers()
+    attempted = False
+    for i, (name, provider) in enumerate(providers):
+        # Budget is taken one provider at a time, since we usually stop early
+        if not search_rate_limiter.try_acquire(name):
+            print(f"[SEARCH] {name} is rate limited, skipping")
+            search_health.cancel(name)
+            continue
+
+        attempted = True
+        results = call_search_provider(name, provider, query)
         if results:
-            print(f"[OK] Google Custom Search API returned {len(results)} results")
+            print(f"[OK] {name} returned {len(results)} results")
+            # Hand back trial slots claimed for providers we didn't get to
+            for skipped, _ in providers[i + 1:]:
+                search_health.cancel(skipped)
             return results
 
-    # Method 2: Try DuckDuckGo (most reliable free option)
-    results = web_search_duckduckgo(query)
-    if results:
-        print(f"[OK] DuckDuckGo returned {len(results)} results")
-        return results
+    if not attempted:
+        entry = wait_for_search_budget(providers, SEARCH_RATE_MAX_WAIT)
+        if entry:
+            return call_search_provider(entry[0], entry[1], query)
+    return None
 
-    # Method 3: Try googlesearch-python library
-    results = web_search_googlesearch(query)
-    if results:
-        print(f"[OK] googlesearch-python returned {len(results)} results")
-        return results
+def merge_search_results(result_sets):
+    """Rank-fuse result lists into the top SEARCH_MAX_RESULTS unique results"""
+    return merge_results(list(result_sets), limit=SEARCH_MAX_RESULTS,
+                         max_distance=SEARCH_DUPLICATE_DISTANCE)
+
+def search_fan_out(query, merge=False):
+    """Query all providers concurrently under one deadline
+
+    In race mode the first result set with at least SEARCH_MIN_RESULTS items
+    wins; if none does, the largest one seen is used. In merge mode every
+    result set that arrives before the deadline is rank-fused, with ties going
+    to the most preferred provider. Providers still running at the end are
+    abandoned.
+    """
+    started = time.time()
+    deadline = started + SEARCH_DEADLINE
+    providers = reserve_search_budget(get_search_providers(), min(SEARCH_RATE_MAX_WAIT, SEARCH_DEADLINE))
+
+    futures = {search_executor.submit(call_search_provider, name, provider, query): name
+               for name, provider in providers}
+    collected = {}
+    pending = set(futures)
 
-    # Method 4: Fallback to direct Google scraping
-    results = web_search_google_scrape(query)
-    if results:
-        print(f"[OK] Google scrape returned {len(results)} results")
-        return results
+    try:
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"[SEARCH] Deadline of {SEARCH_DEADLINE:.0f}s reached, {len(pending)} provider(s) still running")
+                break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"{name} error: {e}")
+                    continue
+                if not results:
+                    continue
 
-    print("[ERROR] All search methods failed")
-    return []
+                print(f"[OK] {name} returned {len(results)} results in {time.time() - started:.1f}s")
+                collected[name] = results
+                if not merge and len(results) >= SEARCH_MIN_RESULTS:
+                    return results
+    finally:
+        # Drop provider calls that haven't started yet
+        for future in pending:
+            if future.cancel():
+                search_health.cancel(futures[future])
+
+    if not collected:
+        return None
+    if merge:
+        return merge_search_results(collected[name] for name, _ in providers if name in collected)
+    return max(collected.values(), key=len)
 
 
 def web_search_google_api(query):
@@ -460,7 +1628,7 @@ def web_search_google_api(query):
             'num': 5
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -480,9 +1648,6 @@ def web_search_google_api(query):
 
 def web_search_duckduckgo(query):
     """Search using DuckDuckGo HTML"""
-    import urllib.parse
-    from bs4 import BeautifulSoup
-
     try:
         search_url = "https://html.duckduckgo.com/html/"
         data = {'q': query}
@@ -496,34 +1661,10 @@ def web_search_duckduckgo(query):
             'Referer': 'https://html.duckduckgo.com/'
         }
 
-        response = requests.post(search_url, data=data, headers=headers, timeout=10)
+        response = http_client.post(search_url, data=data, headers=headers, timeout=10)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
-
-        # Find search results
-        for result in soup.find_all('div', class_='result')[:5]:
-            title_elem = result.find('a', class_='result__a')
-            snippet_elem = result.find('a', class_='result__snippet')
-
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-                link = title_elem.get('href', '')
-
-                # Clean DuckDuckGo redirect URL
-                if 'uddg=' in link:
-                    link = urllib.parse.unquote(link.split('uddg=')[1].split('&')[0])
-
-                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
-
-                if title and link and link.startswith('http'):
-                    results.append({
-                        'title': title,
-                        'snippet': snippet,
-                        'link': link
-                    })
-
+        results = search_parser.parse_duckduckgo(response.text)
         return results if results else None
     except Exception as e:
         print(f"DuckDuckGo error: {e}")
@@ -531,17 +1672,16 @@ def web_search_duckduckgo(query):
 
 
 def web_search_googlesearch(query):
-    """Search using googlesearch-python library"""
+    """Search using googlesearch-python library (paced by search_rate_limiter)"""
     try:
         from googlesearch import search
-        import time
 
         results = []
-        # Add delay to avoid rate limiting
-        time.sleep(1)
 
         try:
-            search_results = list(search(query, num_results=5, advanced=True, sleep_interval=2))
+            # The library sleeps after every page, even the only one; pacing
+            # across requests is done by the rate limiter instead
+            search_results = list(search(query, num_results=5, advanced=True, sleep_interval=0))
         except TypeError:
             # Fallback for older version without sleep_interval
             search_results = list(search(query, num_results=5, advanced=True))
@@ -559,14 +1699,8 @@ def web_search_googlesearch(query):
 
 
 def web_search_google_scrape(query):
-    """Fallback web search using direct Google scraping"""
-    import urllib.parse
-    from bs4 import BeautifulSoup
+    """Fallback web search using direct Google scraping (paced by search_rate_limiter)"""
     import random
-    import time
-
-    # Random delay to avoid detection
-    time.sleep(random.uniform(1, 3))
 
     search_url = "https://www.google.com/search"
     params = {
@@ -601,64 +1735,10 @@ def web_search_google_scrape(query):
     }
 
     try:
-        session = requests.Session()
-        response = session.get(search_url, params=params, headers=headers, timeout=15)
+        response = http_client.get(search_url, params=params, headers=headers, timeout=15)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
-
-        # Try multiple selectors for search results
-        search_divs = soup.find_all('div', class_='g')
-
-        # Alternative selector if 'g' class doesn't work
-        if not search_divs:
-            search_divs = soup.select('div[data-hveid]')
-
-        # Another fallback
-        if not search_divs:
-            search_divs = soup.find_all('div', {'class': lambda x: x and 'g' in x.split()})
-
-        for div in search_divs[:5]:
-            try:
-                # Get title - try multiple selectors
-                title_elem = div.find('h3') or div.find('h2') or div.select_one('[role="heading"]')
-                title = title_elem.get_text(strip=True) if title_elem else ''
-
-                # Get link
-                link_elem = div.find('a', href=True)
-                link = link_elem.get('href', '') if link_elem else ''
-
-                # Clean the link
-                if link.startswith('/url?q='):
-                    link = link.split('/url?q=')[1].split('&')[0]
-                    link = urllib.parse.unquote(link)
-                elif link.startswith('/search'):
-                    continue  # Skip internal Google links
-
-                # Skip if not a valid URL
-                if not link.startswith('http'):
-                    continue
-
-                # Get snippet - try multiple selectors
-                snippet_elem = (
-                    div.find('div', class_='VwiC3b') or
-                    div.find('span', class_='aCOpRe') or
-                    div.select_one('[data-sncf]') or
-                    div.find('div', {'style': lambda x: x and 'line-clamp' in str(x)})
-                )
-                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
-
-                if title and link:
-                    results.append({
-                        'title': title,
-                        'snippet': snippet,
-                        'link': link
-                    })
-
-            except Exception as e:
-                continue
-
+        results = search_parser.parse_google(response.text)
         return results if results else None
 
     except Exception as e:
@@ -851,18 +1931,21 @@ def generate_dociq_response(user_message, session_data):
     # Search for relevant chunks
     relevant_chunks = search_documents(user_message, session_data)
 
-    # Build context from relevant chunks
+    # The general document context only changes when documents do, so it goes
+    # in the system prompt where it can be served from a context cache; the
+    # chunks picked for this question travel with the question instead
+    context = get_combined_document_context(session_data)
+    if context:
+        context = "**Document Content:**\n\n" + context
+
+    question = user_message
     if relevant_chunks:
-        context = "**Relevant Document Content:**\n\n"
+        question = "**Relevant Document Content:**\n\n"
         for i, result in enumerate(relevant_chunks, 1):
-            context += f"[From: {result['doc_name']}]\n{result['chunk']}\n\n---\n\n"
-    else:
-        # If no specific matches, use general document context
-        context = get_combined_document_context(session_data)
-        if context:
-            context = "**Document Content:**\n\n" + context
+            question += f"[From: {result['doc_name']}]\n{result['chunk']}\n\n---\n\n"
+        question += f"**Question:** {user_message}"
 
-    if not context:
+    if not context and not relevant_chunks:
         return "I don't have any document content to reference. Please upload some documents first."
 
     # Create conversation with document context
@@ -873,7 +1956,7 @@ def generate_dociq_response(user_message, session_data):
 You help users understand, analyze, and extract information from their uploaded documents.
 
 IMPORTANT GUIDELINES:
-- Base your answers ONLY on the document content provided below
+- Base your answers ONLY on the document content provided below and with the question
 - If the information is not in the documents, clearly state that
 - Quote relevant passages when appropriate
 - Be precise and accurate
@@ -882,13 +1965,11 @@ IMPORTANT GUIDELINES:
 - Always cite which document the information comes from
 
 UPLOADED DOCUMENT CONTENT:
-{context}
-
-Current date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}"""
+{context}"""
         },
         {
             "role": "user",
-            "content": user_message
+            "content": question
         }
     ]
 
@@ -897,7 +1978,12 @@ Current date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}"""
         if msg['role'] in ['user', 'assistant']:
             conversation.insert(-1, msg)
 
-    return generate_ai_response(conversation)
+    if STABLE_PROMPT_PREFIX:
+        conversation = add_volatile_context(conversation)
+    else:
+        conversation[0]['content'] += f"\n\nCurrent date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+    return generate_ai_response(conversation, priority=PRIORITY_DOCIQ, profile='dociq_answer')
 
 # -------------------------------
 # Routes
@@ -908,6 +1994,175 @@ def index():
     """Main page"""
     return render_template('index.html')
 
+# -------------------------------
+# LLM Job Routes
+# -------------------------------
+
+def wants_async():
+    """Check whether the client asked for a background job instead of a blocking reply"""
+    if request.args.get('async', '').lower() in ('1', 'true'):
+        return True
+    data = request.get_json(silent=True) or {}
+    return data.get('async') is True
+
+def run_llm_request(kind, fn, *args):
+    """Run an LLM-backed endpoint inline, or as a background job when requested
+
+    fn returns a (payload, status_code) tuple. In async mode the client gets a
+    job id straight away and polls or subscribes for the result, so the slow
+    generation doesn't hold a server thread. The job runs with a copy of the
+    request context; session changes made by it can't reach the client's
+    cookie, so the session id and model are settled here, before the response
+    goes out, and handed to the job. Chat turns the job saves are kept in
+    MongoDB or the server-side conversation store.
+    """
+    if not wants_async():
+        payload, status_code = fn(*args)
+        return jsonify(payload), status_code
+
+    session_id = get_session_id()
+    model = get_current_model()
+    job = llm_jobs.submit(copy_current_request_context(run_in_session), fn, session_id, model, *args, kind=kind)
+    if not job:
+        return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {'Retry-After': '5'}
+
+    stats = llm_jobs.get_stats()
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('get_job', job_id=job.id),
+        'stream_url': url_for('stream_job', job_id=job.id),
+        'queue_depth': stats['queue_depth'],
+        'avg_wait_time': stats['avg_wait_time']
+    }), 202
+
+def run_in_session(fn, session_id, model, *args):
+    """Run a background job's endpoint function with the session id and model of the request that queued it"""
+    session['session_id'] = session_id
+    session['ai_model'] = model
+    token = cookie_sent.set(True)
+    try:
+        return fn(*args)
+    finally:
+        cookie_sent.reset(token)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll the status and result of a background LLM job"""
+    job = llm_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """Subscribe to a background LLM job, streaming status changes as NDJSON"""
+    job = llm_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        version = -1
+        while True:
+            new_version = job.wait_for_change(version, timeout=15)
+            if new_version == version and not job.is_finished():
+                # Heartbeat so proxies keep the connection open
+                yield json.dumps({'type': 'heartbeat', 'status': job.status}) + "\n"
+                continue
+            version = new_version
+
+            if job.is_finished():
+                yield json.dumps({'type': 'result', **job.to_dict()}) + "\n"
+                return
+            yield json.dumps({'type': 'status', **job.to_dict()}) + "\n"
+
+    return Response(
+        generate(),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_stats():
+    """Get LLM job queue depth, wait times and per-backend scheduler state"""
+    stats = llm_jobs.get_stats()
+    stats['scheduler'] = llm_scheduler.get_stats()
+    return jsonify(stats)
+
+@app.route('/api/ollama/status', methods=['GET'])
+def ollama_status():
+    """Get health and load of each Ollama host"""
+    return jsonify(ollama_pool.get_stats())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get hit/miss counters of the LLM response, search result and fetched page caches, and the Gemini context caches"""
+    return jsonify({
+        "enabled": LLM_CACHE_ENABLED,
+        "ttl": LLM_CACHE_TTL,
+        "llm": llm_cache.get_stats(),
+        "search": search_cache.get_stats() if SEARCH_CACHE_ENABLED else None,
+        "gemini": gemini_cache.get_stats(),
+        "pages": deep_searcher.get_stats(),
+        "single_flight": {
+            "llm": llm_flight.get_stats(),
+            "search": search_flight.get_stats(),
+            "speech": speech_flight.get_stats()
+        }
+    })
+
+@app.route('/api/usage/stats', methods=['GET'])
+def usage_stats():
+    """Get token totals, generation speed and cost per model since startup"""
+    return jsonify(usage_tracker.get_model_stats())
+
+@app.route('/api/usage/session', methods=['GET'])
+def session_usage():
+    """Get token totals, generation speed and cost for the current session
+
+    ``live`` covers every LLM call made for the session since startup
+    (including summaries); ``stored`` is aggregated from the chat messages
+    saved in MongoDB, so it survives restarts.
+    """
+    session_id = get_session_id()
+    return jsonify({
+        "session_id": session_id,
+        "live": usage_tracker.get_session_stats(session_id),
+        "stored": db.get_chat_usage(session_id) if USE_MONGODB and db.is_connected() else None
+    })
+
+@app.route('/api/search/status', methods=['GET'])
+def search_status():
+    """Get health and circuit breaker state of each search provider"""
+    return jsonify({
+        "mode": SEARCH_MODE,
+        "providers": search_health.get_stats(),
+        "rate_limits": search_rate_limiter.get_stats(),
+        "parser": search_parser.get_stats(),
+        "intent": search_intent.get_stats()
+    })
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the default model can answer without a cold start"""
+    models = {
+        'gpt': {
+            'available': AI_MODELS['gpt']['available'],
+            # Without warm-up there is nothing to wait for
+            'ready': ollama_pool.is_ready() if ollama_pool.warmup_payload else True
+        },
+        'gemini': {
+            'available': AI_MODELS['gemini']['available'],
+            'ready': gemini_client is not None
+        }
+    }
+    ready = models.get(DEFAULT_AI_MODEL, {}).get('ready', False)
+    return jsonify({
+        "ready": ready,
+        "default_model": DEFAULT_AI_MODEL,
+        "models": models
+    }), 200 if ready else 503
+
 # -------------------------------
 # Model Selection Routes
 # -------------------------------
@@ -963,22 +2218,238 @@ def chat():
     data = request.json
     user_message = data.get('message', '')
     force_search = data.get('search', False)
+    deep_search = data.get('deep_search')
 
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
 
-    ai_response, user_idx, ai_idx, searched = chat_with_ai(user_message, force_search)
+    return run_llm_request('chat', run_chat, user_message, force_search, deep_search)
+
+def run_chat(user_message, force_search, deep_search=None):
+    """Run a chat turn and build the /api/chat response payload"""
+    trace = RequestTrace('chat')
+    ai_response, user_idx, ai_idx, (user_id, ai_id), searched = chat_with_ai(user_message, force_search, deep_search, trace)
     current_model = get_current_model()
 
-    return jsonify({
+    return {
         'response': ai_response,
         'user_index': user_idx,
         'ai_index': ai_idx,
+        'user_id': user_id,
+        'ai_id': ai_id,
         'searched': searched,
         'model': current_model,
         'model_name': AI_MODELS[current_model]['name'],
+        'trace': trace.log(),
         'timestamp': datetime.now().isoformat()
-    })
+    }, 200
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat messages, streaming the response as NDJSON events
+
+    Emits one JSON object per line: a ``start`` event with the message index, id
+    and search flag, ``token`` events as the model produces text, and a final
+    ``done`` event once the full response has been saved.
+    """
+    data = request.json
+    user_message = data.get('message', '')
+    force_search = data.get('search', False)
+    deep_search = data.get('deep_search')
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    trace = RequestTrace('chat_stream')
+    conversation, temp_conversation, user_idx, searched = prepare_chat_turn(user_message, force_search, deep_search, trace)
+    current_model = get_current_model()
+
+    # Save the user turn while the session cookie can still be updated
+    with trace.span('save'):
+        save_conversation(conversation)
+
+    def generate():
+        yield json.dumps({
+            'type': 'start',
+            'user_index': user_idx,
+            'user_id': conversation[user_idx].get('_id'),
+            'searched': searched,
+            'model': current_model,
+            'model_name': AI_MODELS[current_model]['name']
+        }) + "\n"
+
+        parts = []
+        usage = {}
+        with trace.span('llm'):
+            for chunk in stream_ai_response(temp_conversation, current_model, usage=usage, profile='chat'):
+                parts.append(chunk)
+                yield json.dumps({'type': 'token', 'content': chunk}) + "\n"
+
+        ai_response_text = "".join(parts)
+
+        # Persist the completed turn. The session cookie has already been sent
+        # at this point, so the reply is kept in MongoDB or, without it, in the
+        # server-side conversation store.
+        ai_msg_obj = {"role": "assistant", "content": ai_response_text}
+        if usage:
+            ai_msg_obj["usage"] = usage
+        conversation.append(ai_msg_obj)
+        ai_index = len(conversation) - 1
+        with trace.span('save'):
+            token = cookie_sent.set(True)
+            try:
+                save_conversation(conversation)
+            finally:
+                cookie_sent.reset(token)
+
+        yield json.dumps({
+            'type': 'done',
+            'ai_index': ai_index,
+            'ai_id': ai_msg_obj.get('_id'),
+            'usage': usage or None,
+            'trace': trace.log(),
+            'timestamp': datetime.now().isoformat()
+        }) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def build_batch_conversation(item):
+    """Turn a batch item into a conversation, or None if it is malformed
+
+    An item is either {"message": "..."} or {"messages": [{"role", "content"}, ...]};
+    the Axio system prompt is added unless the item brings its own.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    if isinstance(item.get('messages'), list):
+        messages = item['messages']
+    elif isinstance(item.get('message'), str) and item['message']:
+        messages = [{"role": "user", "content": item['message']}]
+    else:
+        return None
+
+    conversation = []
+    for msg in messages:
+        if not isinstance(msg, dict) or msg.get('role') not in ('system', 'user', 'assistant') \
+                or not isinstance(msg.get('content'), str):
+            return None
+        conversation.append({"role": msg['role'], "content": msg['content']})
+
+    if not conversation or conversation[-1]['role'] != 'user':
+        return None
+    if conversation[0]['role'] != 'system':
+        conversation.insert(0, {"role": "system", "content": get_system_prompt()})
+    return conversation
+
+def run_batch_item(index, item_id, conversation, model, batch_id, use_cache, batch_started):
+    """Generate the reply for one batch item and time it"""
+    started = time.time()
+    window = build_context_window(conversation, model=model)
+    usage = {}
+    response = generate_ai_response(window, model=model, priority=PRIORITY_BATCH,
+                                    session_key=batch_id, use_cache=use_cache, usage=usage)
+    finished = time.time()
+
+    return {
+        'type': 'result',
+        'index': index,
+        'id': item_id,
+        'ok': not is_error_response(response),
+        'response': response,
+        'queued_time': round(started - batch_started, 3),
+        'elapsed_time': round(finished - started, 3),
+        'usage': usage or None
+    }
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Run many independent conversations, streaming results as NDJSON as they finish
+
+    Items run with bounded concurrency at batch priority and don't touch the
+    caller's chat session. Emits a ``start`` event, one ``result`` event per
+    item in completion order, and a final ``done`` event with totals.
+    """
+    data = request.json or {}
+    items = data.get('items')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No items provided'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items (max {BATCH_MAX_ITEMS})'}), 400
+
+    model = data.get('model') or get_current_model()
+    if model not in AI_MODELS or not AI_MODELS[model]['available']:
+        return jsonify({'error': 'Invalid or unavailable model'}), 400
+
+    conversations = [build_batch_conversation(item) for item in items]
+    invalid = [i for i, conversation in enumerate(conversations) if conversation is None]
+    if invalid:
+        return jsonify({'error': 'Invalid items', 'indexes': invalid}), 400
+
+    try:
+        concurrency = int(data.get('concurrency') or BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid concurrency'}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY, len(items)))
+
+    use_cache = data.get('cache', True) is not False
+    batch_id = f"batch-{uuid.uuid4()}"
+
+    def generate():
+        batch_started = time.time()
+        succeeded = 0
+
+        yield json.dumps({
+            'type': 'start',
+            'batch_id': batch_id,
+            'count': len(items),
+            'model': model,
+            'concurrency': concurrency
+        }) + "\n"
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='chat-batch')
+        try:
+            futures = {
+                executor.submit(run_batch_item, i, item.get('id', i), conversation, model,
+                                batch_id, use_cache, batch_started): i
+                for i, (item, conversation) in enumerate(zip(items, conversations))
+            }
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    index = futures[future]
+                    result = {
+                        'type': 'result',
+                        'index': index,
+                        'id': items[index].get('id', index),
+                        'ok': False,
+                        'response': f"An error occurred: {str(e)}"
+                    }
+                succeeded += result['ok']
+                yield json.dumps(result) + "\n"
+        finally:
+            # Drop items that haven't started if the client went away
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield json.dumps({
+            'type': 'done',
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'total_time': round(time.time() - batch_started, 3)
+        }) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/chat/edit', methods=['POST'])
 def edit_chat():
@@ -1002,8 +2473,23 @@ def edit_chat():
     if not new_content:
         return jsonify({'error': 'No content provided'}), 400
 
+    return run_llm_request('chat_edit', run_chat_edit, message_index, new_content, data.get('message_id'))
+
+def run_chat_edit(message_index, new_content, message_id=None):
+    """Apply a message edit, regenerate the reply and build the response payload
+
+    Stored messages are looked up by message_id, since their position in the
+    loaded history moves as older turns are summarized; the index is only
+    trusted for messages kept in session storage. Nothing is changed (409)
+    when the message can't be found.
+    """
     conversation = get_conversation()
 
+    if message_id:
+        message_index = next((i for i, msg in enumerate(conversation) if msg.get('_id') == message_id), None)
+        if message_index is None:
+            return {'error': 'This message is no longer in the conversation history and can\'t be edited'}, 409
+
     # Debug logging
     print(f"Conversation length: {len(conversation)}, Requested index: {message_index}")
     for i, msg in enumerate(conversation):
@@ -1011,34 +2497,60 @@ def edit_chat():
 
     # Validate index (must be >= 1 because index 0 is system message)
     if message_index < 1 or message_index >= len(conversation):
-        return jsonify({'error': f'Invalid index - out of range. Index: {message_index}, Conversation length: {len(conversation)}'}), 400
+        return {'error': f'Invalid index - out of range. Index: {message_index}, Conversation length: {len(conversation)}'}, 400
 
     # Verify we're editing a user message
     if conversation[message_index]['role'] != 'user':
-        return jsonify({'error': 'Can only edit user messages'}), 400
+        return {'error': 'Can only edit user messages'}, 400
 
-    # Update the message
-    conversation[message_index]['content'] = new_content
+    # A position alone can't be checked against a stored message
+    if not message_id and conversation[message_index].get('_id'):
+        return {'error': 'Stored messages are edited by message_id; reload the conversation and try again'}, 409
+
+    session_id = get_session_id()
+
+    # The summary is stale if it covers the edited message or anything after it
+    summary = get_chat_summary(session_id)
+    if summary and find_summary_boundary(conversation, summary) >= message_index:
+        invalidate_chat_summary(session_id)
+
+    # Update the message (and drop its cached token count)
+    edited_msg = conversation[message_index]
+    edited_msg['content'] = new_content
+    edited_msg.pop('_tokens', None)
 
     # Remove everything after this message (truncate history)
     # We keep the edited message (at message_index), remove subsequent ones
     del conversation[message_index+1:]
 
+    # Apply the same edit to MongoDB so reloaded history matches
+    if USE_MONGODB and db.is_connected() and edited_msg.get('_id'):
+        db.update_chat_message(edited_msg['_id'], new_content)
+        db.update_chat_message_metadata(edited_msg['_id'], {"token_count": message_tokens(edited_msg)})
+        db.delete_chat_messages_after(session_id, edited_msg['_id'])
+
     # Generate new response based on updated history
-    ai_response_text = generate_ai_response(conversation)
+    usage = {}
+    ai_response_text = generate_ai_response(build_context_window(conversation, session_id=session_id),
+                                            usage=usage, profile='chat')
 
     # Append new AI response
-    conversation.append({"role": "assistant", "content": ai_response_text})
+    ai_msg_obj = {"role": "assistant", "content": ai_response_text}
+    if usage:
+        ai_msg_obj["usage"] = usage
+    conversation.append(ai_msg_obj)
     ai_index = len(conversation) - 1
 
     save_conversation(conversation)
 
-    return jsonify({
+    return {
         'response': ai_response_text,
         'user_index': message_index,
         'ai_index': ai_index,
+        'user_id': edited_msg.get('_id'),
+        'ai_id': ai_msg_obj.get('_id'),
         'timestamp': datetime.now().isoformat()
-    })
+    }, 200
 
 @app.route('/api/chat/reset', methods=['POST'])
 def reset_chat():
@@ -1049,8 +2561,13 @@ def reset_chat():
     if USE_MONGODB and db.is_connected():
         db.clear_chat_history(session_id)
 
+    # Drop the rolling summary along with the history it covered
+    invalidate_chat_summary(session_id)
+
     # Clear from session
     session.pop('conversation', None)
+    with chat_conversations_lock:
+        chat_conversations.pop(session_id, None)
     return jsonify({'status': 'success', 'message': 'Conversation reset'})
 
 @app.route('/api/chat/debug', methods=['GET'])
@@ -1072,15 +2589,19 @@ def search():
     if not query:
         return jsonify({'error': 'No query provided'}), 400
 
+    return run_llm_request('search', run_search, query, summarize)
+
+def run_search(query, summarize):
+    """Run a web search with optional AI summary and build the response payload"""
     # Perform web search
     results = web_search(query)
 
     if not results:
-        return jsonify({
+        return {
             'results': [],
             'summary': 'No search results found.',
             'query': query
-        })
+        }, 200
 
     # If summarize is requested, use AI to summarize results
     summary = None
@@ -1105,13 +2626,13 @@ def search():
                 "content": search_context + "\n\nPlease summarize these search results and provide the most relevant information."
             }
         ]
-        summary = generate_ai_response(summary_conversation)
+        summary = generate_ai_response(summary_conversation, priority=PRIORITY_BATCH, profile='search_summary')
 
-    return jsonify({
+    return {
         'results': results,
         'summary': summary,
         'query': query
-    })
+    }, 200
 
 @app.route('/api/speech', methods=['POST'])
 def text_to_speech():
@@ -1535,6 +3056,11 @@ def dociq_summary():
     if not session_data['documents']:
         return jsonify({'error': 'No documents uploaded'}), 400
 
+    return run_llm_request('dociq_summary', run_dociq_summary, session_data)
+
+def run_dociq_summary(session_data):
+    """Summarize the uploaded documents and build the response payload"""
+
     # Build document overview
     doc_overview = "**Uploaded Documents:**\n\n"
     total_text_length = 0
@@ -1567,13 +3093,13 @@ Provide:
         }
     ]
 
-    summary = generate_ai_response(summary_conversation)
+    summary = generate_ai_response(summary_conversation, priority=PRIORITY_BATCH, profile='dociq_summary')
 
-    return jsonify({
+    return {
         'summary': summary,
         'document_count': len(session_data['documents']),
         'total_text_length': total_text_length
-    })
+    }, 200
 
 # -------------------------------
 # VizIQ Routes - Data Intelligence
@@ -2179,12 +3705,19 @@ def viziq_get_data():
 # Main
 # -------------------------------
 
+@app.before_request
+def warm_up_on_first_request():
+    """Start the GPT warm-up in processes that serve requests (WSGI workers included)"""
+    if not model_warmup_started.is_set():
+        start_model_warmup()
+
 if __name__ == '__main__':
     print("=" * 50)
     print("Axio AI Code Assistant by Perfionix AI - Starting...")
     print("=" * 50)
     print(f"GPT Server: {GPT_SERVER_URL}")
     print(f"GPT Model: {GPT_MODEL}")
+    print(f"GPT Warm-up: {'Enabled (keep_alive ' + OLLAMA_KEEP_ALIVE + ')' if OLLAMA_WARMUP else 'Disabled'}")
     print(f"Gemini Model: {GEMINI_MODEL}")
     print(f"Gemini Client: {'Initialized' if gemini_client else 'Not initialized'}")
     print(f"Voice: {'Enabled' if ELEVENLABS_API_KEY else 'Disabled (no API key)'}")
@@ -2193,4 +3726,9 @@ if __name__ == '__main__':
     print("Open http://localhost:5000 in your browser")
     print("=" * 50)
 
+    # Preload the GPT model before the first request, except in the reloader's
+    # watcher process, which never serves any
+    if os.getenv('FLASK_DEBUG', 'True') != 'True' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_model_warmup()
+
     app.run(debug=os.getenv('FLASK_DEBUG', 'True') == 'True', host='0.0.0.0', port=5000)
@@ -0,0 +1,88 @@
+"""
+Search Result Parsing Benchmark for Axio AI
+Parse time and allocations of each parser backend, full vs strained, over saved result pages
+
+Usage:
+    python benchmarks/parse_search_results.py [--iterations N]
+
+The fixture pages in benchmarks/fixtures are offline copies shaped like the
+DuckDuckGo HTML and Google results pages. Every configuration must extract
+the same results as the original full html.parser parse, otherwise it is
+reported as a mismatch.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_parsers import LXML_AVAILABLE, ResultPageParser  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+FIXTURES = [
+    ('duckduckgo.html', 'parse_duckduckgo'),
+    ('google.html', 'parse_google')
+]
+
+
+def load_fixture(name):
+    """Read a saved result page"""
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def measure_time(parse, html, iterations):
+    """Get the median and best parse time in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        parse(html)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def measure_allocations(parse, html):
+    """Get the peak traced memory and the number of allocated blocks of one parse"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    parse(html)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50, help='parses per configuration')
+    args = parser.parse_args()
+
+    backends = ['html.parser'] + (['lxml'] if LXML_AVAILABLE else [])
+    if not LXML_AVAILABLE:
+        print("lxml is not installed; only html.parser is benchmarked\n")
+
+    print(f"{'page':<16}{'backend':<13}{'mode':<10}{'median ms':>10}{'best ms':>10}{'peak KiB':>10}{'blocks':>9}  results")
+    for name, method in FIXTURES:
+        html = load_fixture(name)
+        expected = getattr(ResultPageParser('html.parser', strained=False), method)(html)
+
+        for backend in backends:
+            for strained in (False, True):
+                parse = getattr(ResultPageParser(backend, strained=strained), method)
+                results = parse(html)
+                median, best = measure_time(parse, html, args.iterations)
+                peak, blocks = measure_allocations(parse, html)
+                check = f"{len(results)}" if results == expected else f"{len(results)} MISMATCH"
+                mode = 'strained' if strained else 'full'
+                print(f"{name:<16}{backend:<13}{mode:<10}{median:>10.2f}{best:>10.2f}{peak / 1024:>10.0f}{blocks:>9}  {check}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Caching Module for Axio AI
+In-memory LRU cache with per-entry TTLs, a byte budget and an optional on-disk tier
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(*parts):
+    """Hash JSON-serializable parts into a stable cache key"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """LRU cache of JSON-serializable values that expire after a TTL
+
+    Memory use is capped by the serialized size of the stored values. When a
+    disk directory is given, entries are also written there as JSON files, so
+    the cache survives restarts; disk hits are promoted back into memory.
+    """
+
+    # Check the disk tier against its byte cap every this many writes
+    DISK_PRUNE_EVERY = 50
+
+    def __init__(self, name, ttl_seconds=3600, max_bytes=16 * 1024 * 1024,
+                 disk_dir=None, disk_max_bytes=None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes or max_bytes * 8
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                print(f"[WARNING] {self.name} cache disk tier disabled: {e}")
+                self.disk_dir = None
+
+    def get(self, key):
+        """Get a cached value, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                value, expires_at, size = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        value, expires_at = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value, expires_at)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value for ttl seconds (defaults to the cache TTL)"""
+        expires_at = time.time() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        """Insert into memory and evict down to the byte cap (caller holds the lock)"""
+        size = len(json.dumps(value, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        """Drop an in-memory entry (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry[2]
+
+    def _disk_path(self, key):
+        """Get the file that holds a key in the disk tier"""
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key, now):
+        """Load an unexpired entry from the disk tier; (None, None) if absent"""
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None, None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+
+        if data.get("expires_at", 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None, None
+        return data.get("value"), data["expires_at"]
+
+    def _write_disk(self, key, value, expires_at):
+        """Best-effort write of an entry to the disk tier"""
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[WARNING] {self.name} cache disk write failed: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % self.DISK_PRUNE_EVERY == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently written files until the disk tier fits its byte cap
+
+        Expired files are removed when they are next read.
+        """
+        files = []
+        try:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Get hit/miss counters and memory use"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "disk_tier": self.disk_dir is not None
+            }
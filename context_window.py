@@ -0,0 +1,91 @@
+"""
+Context Window Module for Axio AI
+Token counting and budget-based selection of chat history sent to the model
+"""
+
+import math
+import re
+import uuid
+
+# Words, numbers and individual punctuation marks
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Approximate characters per sub-word token for BPE-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Role markers and separators added by chat templates for every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text):
+    """Estimate the number of tokens in a text
+
+    Neither Ollama nor Gemini expose a local tokenizer, so this approximates a
+    BPE tokenizer: punctuation counts as one token and long words are split
+    into roughly four-character pieces.
+    """
+    if not text:
+        return 0
+
+    total = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        total += max(1, math.ceil(len(match.group(0)) / CHARS_PER_TOKEN))
+    return total
+
+
+def message_tokens(message):
+    """Get the token count of a chat message, caching it on the message"""
+    cached = message.get("_tokens")
+    if cached is None:
+        cached = count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        message["_tokens"] = cached
+    return cached
+
+
+def message_key(message):
+    """Get a stable identifier for a chat message
+
+    Uses the MongoDB id when the message has been persisted. Otherwise a random
+    key is assigned to the message, which travels with it in session storage.
+    """
+    if message.get("_id"):
+        return message["_id"]
+    if not message.get("_key"):
+        message["_key"] = uuid.uuid4().hex
+    return message["_key"]
+
+
+def clean_message(message):
+    """Strip internal bookkeeping keys before sending a message to a model"""
+    return {"role": message.get("role"), "content": message.get("content", "")}
+
+
+def fit_to_budget(conversation, budget):
+    """Select the newest messages that fit within a token budget
+
+    System messages are always kept. The remaining budget is filled with the
+    most recent turns first, and the newest message is kept even when it alone
+    exceeds the budget. Returns the window to send to the model and the list of
+    older messages that were evicted, both in chronological order.
+    """
+    system_messages = [msg for msg in conversation if msg.get("role") == "system"]
+    history = [msg for msg in conversation if msg.get("role") != "system"]
+
+    remaining = budget - sum(message_tokens(msg) for msg in system_messages)
+
+    kept = []
+    for msg in reversed(history):
+        tokens = message_tokens(msg)
+        if tokens > remaining and kept:
+            break
+        kept.append(msg)
+        remaining -= tokens
+    kept.reverse()
+
+    # Don't open the window with an answer whose question was evicted
+    while len(kept) > 1 and kept[0].get("role") == "assistant":
+        kept.pop(0)
+
+    evicted = history[:len(history) - len(kept)]
+    window = [clean_message(msg) for msg in system_messages + kept]
+    return window, evicted
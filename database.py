@@ -54,6 +54,9 @@ class Database:
             # Chat messages index
             self.db.chat_messages.create_index([("session_id", 1), ("created_at", -1)])
 
+            # Chat summaries index
+            self.db.chat_summaries.create_index([("session_id", 1)], unique=True)
+
             # Tasks index
             self.db.tasks.create_index([("created_at", -1)])
             self.db.tasks.create_index([("completed", 1)])
@@ -100,15 +103,25 @@ class Database:
         result = self.db.chat_messages.insert_one(message)
         return str(result.inserted_id)
 
-    def get_chat_history(self, session_id, limit=50):
-        """Get chat history for a session"""
+    def get_chat_history(self, session_id, after_id=None):
+        """Get chat history for a session, oldest first
+
+        With after_id, only the messages stored after that message are
+        returned (all of them if it no longer exists).
+        """
         if not self.is_connected():
             return []
 
-        messages = self.db.chat_messages.find(
-            {"session_id": session_id}
-        ).sort("created_at", 1).limit(limit)
+        query = {"session_id": session_id}
+        if after_id:
+            try:
+                after = self.db.chat_messages.find_one({"_id": ObjectId(after_id), "session_id": session_id})
+            except Exception:
+                after = None
+            if after:
+                query["created_at"] = {"$gt": after["created_at"]}
 
+        messages = self.db.chat_messages.find(query).sort("created_at", 1)
         return [self._serialize_doc(msg) for msg in messages]
 
     def update_chat_message(self, message_id, new_content):
@@ -122,6 +135,47 @@ class Database:
         )
         return result.modified_count > 0
 
+    def update_chat_message_metadata(self, message_id, updates):
+        """Set individual metadata fields on a chat message"""
+        if not self.is_connected():
+            return False
+
+        fields = {f"metadata.{key}": value for key, value in updates.items()}
+        result = self.db.chat_messages.update_one(
+            {"_id": ObjectId(message_id)},
+            {"$set": fields}
+        )
+        return result.modified_count > 0
+
+    def get_chat_usage(self, session_id):
+        """Aggregate the token and timing metrics stored on a session's messages, per model"""
+        if not self.is_connected():
+            return {}
+
+        pipeline = [
+            {"$match": {"session_id": session_id, "metadata.usage": {"$exists": True}}},
+            {"$group": {
+                "_id": "$metadata.usage.model",
+                "messages": {"$sum": 1},
+                "prompt_tokens": {"$sum": "$metadata.usage.prompt_tokens"},
+                "completion_tokens": {"$sum": "$metadata.usage.completion_tokens"},
+                "generation_seconds": {"$sum": {"$ifNull": ["$metadata.usage.generation_seconds", "$metadata.usage.total_seconds"]}},
+                "cost": {"$sum": "$metadata.usage.cost"}
+            }}
+        ]
+
+        usage = {}
+        for row in self.db.chat_messages.aggregate(pipeline):
+            seconds = row["generation_seconds"] or 0
+            usage[row["_id"] or "unknown"] = {
+                "messages": row["messages"],
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+                "tokens_per_second": round(row["completion_tokens"] / seconds, 2) if seconds else 0.0,
+                "cost": round(row["cost"], 6)
+            }
+        return usage
+
     def delete_chat_messages_after(self, session_id, message_id):
         """Delete all messages after a specific message"""
         if not self.is_connected():
@@ -147,6 +201,44 @@ class Database:
         result = self.db.chat_messages.delete_many({"session_id": session_id})
         return result.deleted_count >= 0
 
+    # ========================
+    # Chat Summary Operations
+    # ========================
+
+    def get_chat_summary(self, session_id):
+        """Get the rolling conversation summary for a session"""
+        if not self.is_connected():
+            return None
+
+        summary = self.db.chat_summaries.find_one({"session_id": session_id})
+        return self._serialize_doc(summary) if summary else None
+
+    def save_chat_summary(self, session_id, summary, covered_until, token_count=0):
+        """Save the rolling conversation summary for a session"""
+        if not self.is_connected():
+            return None
+
+        result = self.db.chat_summaries.update_one(
+            {"session_id": session_id},
+            {"$set": {
+                "session_id": session_id,
+                "summary": summary,
+                "covered_until": covered_until,
+                "token_count": token_count,
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+        return str(result.upserted_id) if result.upserted_id else "updated"
+
+    def clear_chat_summary(self, session_id):
+        """Clear the rolling conversation summary for a session"""
+        if not self.is_connected():
+            return False
+
+        result = self.db.chat_summaries.delete_one({"session_id": session_id})
+        return result.deleted_count > 0
+
     # ========================
     # Tasks Operations
     # ========================
@@ -0,0 +1,589 @@
+"""
+Deep Search Module for Axio AI
+Concurrent page fetching, streaming text extraction and passage selection for web search results
+"""
+
+import codecs
+import ipaddress
+import math
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+
+from caching import TTLCache, make_cache_key
+from single_flight import SingleFlight
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Words that carry no weight when matching passages to a query
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i in is it its me my of on or
+the this that to was what when where which who why will with you your about into
+""".split())
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Statuses whose Location header is followed
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def tokenize(text):
+    """Split text into lowercase terms, dropping stopwords and single characters"""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML-to-text extractor that keeps paragraph blocks and drops page chrome
+
+    Text is collected as the page is fed in, so the caller can stop reading
+    once enough has been extracted. Blocks inside <article> or <main> are
+    marked so the main content can be preferred over the rest of the page.
+    """
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer',
+                 'aside', 'form', 'iframe', 'button', 'select', 'head'}
+    MAIN_TAGS = {'article', 'main'}
+    BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'br', 'tr', 'table',
+                  'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'dd', 'dt', 'td'}
+
+    # Blocks shorter than this many words are menus, buttons and captions
+    MIN_BLOCK_WORDS = 6
+    # Prefer <article>/<main> text when it holds at least this much
+    MIN_MAIN_CHARS = 500
+
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ''
+        self.blocks = []
+        self.chars = 0
+        self._current = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    @property
+    def full(self):
+        """Whether enough text has been extracted to stop reading"""
+        return self.chars >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._flush()
+        if tag == 'title':
+            self._in_title = True
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self._flush()
+        if tag == 'title':
+            self._in_title = False
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def _flush(self):
+        """Close the current block, keeping it if it looks like prose"""
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        if len(text.split()) >= self.MIN_BLOCK_WORDS:
+            self.blocks.append((text, self._main_depth > 0))
+            self.chars += len(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def get_title(self):
+        """Get the page title with whitespace collapsed"""
+        return " ".join(self.title.split())
+
+    def get_blocks(self):
+        """Get the extracted blocks, limited to the main content when the page marks it"""
+        main = [text for text, in_main in self.blocks if in_main]
+        if sum(len(text) for text in main) >= self.MIN_MAIN_CHARS:
+            return main
+        return [text for text, _ in self.blocks]
+
+
+class PlainTextExtractor:
+    """Extractor for text/plain pages with the same interface as TextExtractor"""
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self._parts = []
+        self.chars = 0
+
+    @property
+    def full(self):
+        """Whether enough text has been extracted to stop reading"""
+        return self.chars >= self.max_chars
+
+    def feed(self, text):
+        self._parts.append(text)
+        self.chars += len(text)
+
+    def close(self):
+        pass
+
+    def get_title(self):
+        return ''
+
+    def get_blocks(self):
+        """Get the paragraphs of the text"""
+        paragraphs = re.split(r'\n\s*\n', "".join(self._parts))
+        return [" ".join(p.split()) for p in paragraphs if p.strip()]
+
+
+def split_passages(blocks, passage_chars):
+    """Group consecutive blocks into passages of about passage_chars characters
+
+    Blocks longer than a passage are cut at word boundaries.
+    """
+    passages = []
+    current = ''
+    for block in blocks:
+        words = block.split()
+        while len(block) > passage_chars:
+            piece, count = '', 0
+            for word in words:
+                if len(piece) + len(word) + 1 > passage_chars and piece:
+                    break
+                piece = f"{piece} {word}" if piece else word
+                count += 1
+            if current:
+                passages.append(current)
+                current = ''
+            passages.append(piece)
+            words = words[count:]
+            block = " ".join(words)
+        if not block:
+            continue
+        if current and len(current) + len(block) + 1 > passage_chars:
+            passages.append(current)
+            current = block
+        else:
+            current = f"{current}\n{block}" if current else block
+    if current:
+        passages.append(current)
+    return passages
+
+
+def rank_passages(query, passages, k1=1.2, b=0.75):
+    """Score (doc_index, passage) pairs against the query with BM25"""
+    query_terms = set(tokenize(query))
+    if not query_terms or not passages:
+        return []
+
+    tokenized = [tokenize(text) for _, text in passages]
+    avg_length = sum(len(terms) for terms in tokenized) / len(tokenized) or 1
+    doc_freq = {term: sum(1 for terms in tokenized if term in terms) for term in query_terms}
+
+    scored = []
+    seen = set()
+    for (doc_index, text), terms in zip(passages, tokenized):
+        # Boilerplate repeated across a page or across mirrors only counts once
+        if text in seen:
+            continue
+        seen.add(text)
+        score = 0.0
+        for term in query_terms:
+            tf = terms.count(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(tokenized) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(terms) / avg_length))
+        if score > 0:
+            scored.append((score, doc_index, text))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
+
+
+def iter_body(response, chunk_size):
+    """Yield a streamed response body as its bytes arrive
+
+    iter_content() waits for a full chunk, so a slowly trickling page would
+    stall past the time limit between checks. urllib3 2.x can return whatever
+    has been received instead; older versions fall back to small chunks.
+    """
+    raw = response.raw
+    if not hasattr(raw, 'read1'):
+        yield from response.iter_content(chunk_size=4096)
+        return
+    while True:
+        chunk = raw.read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_fetchable_url(url, resolve=False):
+    """Check that a URL is a public http(s) address worth fetching
+
+    With resolve set, the host name is looked up as well and every address it
+    resolves to must be public, so a name pointing into a private network or
+    at a metadata service is refused.
+    """
+    if resolve:
+        return resolve_public_address(url) is not None
+    return _public_host(url) is not None
+
+
+def _public_host(url):
+    """Get the host of an http(s) URL unless it is plainly local or a non-public IP"""
+    try:
+        parts = urlsplit(url or '')
+    except ValueError:
+        return None
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if host == 'localhost' or host.endswith('.local') or host.endswith('.internal'):
+        return None
+    try:
+        if not ipaddress.ip_address(host).is_global:
+            return None
+    except ValueError:
+        pass
+    return host
+
+
+def resolve_public_address(url):
+    """Get the IP address to connect to for a URL, or None unless every address of its host is public
+
+    The caller connects to this address rather than letting the HTTP client
+    look the name up again, which could return a different (private) address.
+    """
+    host = _public_host(url)
+    if host is None:
+        return None
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        pass
+
+    parts = urlsplit(url)
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == 'https' else 80),
+                                   type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return None
+    # Drop any IPv6 scope id before parsing
+    addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos]
+    if not addresses or not all(address.is_global for address in addresses):
+        return None
+    return str(addresses[0])
+
+
+def pin_url(url, address):
+    """Get the URL with its host replaced by an IP address, and the Host header for the original host"""
+    parts = urlsplit(url)
+    host = f"[{address}]" if ':' in address else address
+    netloc = f"{host}:{parts.port}" if parts.port else host
+    original = parts.netloc.rsplit('@', 1)[-1]
+    return parts._replace(netloc=netloc).geturl(), original
+
+
+class PinnedPoolManager(PoolManager):
+    """Pool manager that checks TLS certificates against the name set on its adapter, not the IP connected to"""
+
+    def __init__(self, adapter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.adapter = adapter
+
+    def connection_from_host(self, host, port=None, scheme='http', pool_kwargs=None):
+        server_hostname = getattr(self.adapter.pinned, 'host', None)
+        if server_hostname and scheme == 'https':
+            pool_kwargs = dict(pool_kwargs or {}, server_hostname=server_hostname)
+        return super().connection_from_host(host, port, scheme, pool_kwargs)
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """Adapter for requests sent to a pinned IP address with the real host in the Host header
+
+    SNI and certificate checks use the host name from the Host header, so
+    HTTPS works while the connection goes to the address that was checked.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.pinned = threading.local()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = PinnedPoolManager(self, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs)
+
+    def send(self, request, **kwargs):
+        self.pinned.host = urlsplit(f"//{request.headers.get('Host', '')}").hostname
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            self.pinned.host = None
+
+
+class DeepSearcher:
+    """Fetches the top search result pages in parallel and picks the passages relevant to a query
+
+    Every page is read as a stream under a byte cap and a time limit, and its
+    text is extracted while it arrives. Extracted documents are cached by URL
+    together with the page's ETag/Last-Modified: within the freshness window
+    they are reused as-is, after it the page is revalidated with a conditional
+    request and a 304 keeps the cached text.
+    """
+
+    # Largest read from a page at a time
+    CHUNK_BYTES = 16384
+    # Redirect hops followed per page
+    MAX_REDIRECTS = 3
+
+    def __init__(self, top_k=None, max_page_bytes=None, max_page_chars=None, page_timeout=None,
+                 deadline=None, budget_chars=None, passage_chars=None, max_passages_per_page=None,
+                 fresh_seconds=None, workers=None):
+        self.top_k = top_k or int(os.getenv('DEEP_SEARCH_TOP_K', '3'))
+        self.max_page_bytes = max_page_bytes or int(os.getenv('DEEP_SEARCH_MAX_PAGE_BYTES', str(512 * 1024)))
+        self.max_page_chars = max_page_chars or int(os.getenv('DEEP_SEARCH_MAX_PAGE_CHARS', '50000'))
+        self.page_timeout = page_timeout or float(os.getenv('DEEP_SEARCH_PAGE_TIMEOUT', '4'))
+        self.deadline = deadline or float(os.getenv('DEEP_SEARCH_DEADLINE', '5'))
+        self.budget_chars = budget_chars or int(os.getenv('DEEP_SEARCH_BUDGET_CHARS', '6000'))
+        self.passage_chars = passage_chars or int(os.getenv('DEEP_SEARCH_PASSAGE_CHARS', '600'))
+        self.max_passages_per_page = max_passages_per_page or int(os.getenv('DEEP_SEARCH_PASSAGES_PER_PAGE', '3'))
+        self.fresh_seconds = fresh_seconds or int(os.getenv('DEEP_SEARCH_FRESH_SECONDS', '900'))
+
+        self.cache = TTLCache(
+            'pages',
+            int(os.getenv('DEEP_SEARCH_CACHE_TTL', '86400')),
+            int(os.getenv('DEEP_SEARCH_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+            disk_dir=os.getenv('DEEP_SEARCH_CACHE_DIR', '')
+        )
+        self.flight = SingleFlight('pages')
+        self.executor = ThreadPoolExecutor(max_workers=workers or int(os.getenv('DEEP_SEARCH_WORKERS', '8')),
+                                           thread_name_prefix='deep-search')
+        self.session = self._build_session()
+
+        self.fetched = 0
+        self.not_modified = 0
+        self.fresh_hits = 0
+        self.truncated = 0
+        self.failures = 0
+
+    def _build_session(self):
+        """Create a session for arbitrary hosts: bounded pools, no retries"""
+        session = requests.Session()
+        adapter = PinnedAddressAdapter(pool_connections=32, pool_maxsize=4, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _open(self, url, headers, timeout):
+        """GET a page as a stream, following redirects by hand so every hop is checked
+
+        Each hop connects to the address that was checked, so a host that
+        answers a second lookup differently (DNS rebinding) can't redirect the
+        connection. Returns None when a hop is not a public address or there
+        are too many hops.
+        """
+        for _ in range(self.MAX_REDIRECTS + 1):
+            address = resolve_public_address(url)
+            if address is None:
+                print(f"[DeepSearch] Refusing to fetch non-public address {url}")
+                return None
+            pinned_url, host = pin_url(url, address)
+            response = self.session.get(pinned_url, headers=dict(headers, Host=host), stream=True,
+                                        timeout=timeout, allow_redirects=False)
+            location = response.headers.get('Location')
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return response
+            response.close()
+            url = urljoin(url, location)
+
+        print(f"[DeepSearch] Too many redirects for {url}")
+        return None
+
+    def fetch_page(self, url, deadline):
+        """Get the extracted text of a page, from the cache or the network; None on failure"""
+        key = make_cache_key('page', url)
+        cached = self.cache.get(key)
+        if cached and cached.get('fresh_until', 0) > time.time():
+            self.fresh_hits += 1
+            return cached
+
+        timeout = min(self.page_timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return None
+
+        headers = {
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,text/plain;q=0.9'
+        }
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response = self._open(url, headers, timeout)
+            if response is None:
+                self.failures += 1
+                return None
+            with response:
+                if response.status_code == 304 and cached:
+                    self.not_modified += 1
+                    cached['fresh_until'] = time.time() + self.fresh_seconds
+                    self.cache.set(key, cached)
+                    return cached
+                if response.status_code != 200:
+                    self.failures += 1
+                    print(f"[DeepSearch] {url} returned {response.status_code}")
+                    return None
+
+                content_type = response.headers.get('Content-Type', '').lower()
+                if 'html' in content_type:
+                    extractor = TextExtractor(self.max_page_chars)
+                elif 'text/plain' in content_type:
+                    extractor = PlainTextExtractor(self.max_page_chars)
+                else:
+                    return None
+
+                self._read_into(response, extractor, content_type, min(time.monotonic() + timeout, deadline))
+                doc = {
+                    "url": url,
+                    "title": extractor.get_title(),
+                    "blocks": extractor.get_blocks(),
+                    "etag": response.headers.get('ETag'),
+                    "last_modified": response.headers.get('Last-Modified'),
+                    "fresh_until": time.time() + self.fresh_seconds
+                }
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError, LookupError) as e:
+            self.failures += 1
+            print(f"[DeepSearch] Failed to fetch {url}: {e}")
+            return None
+
+        self.fetched += 1
+        if doc["blocks"]:
+            self.cache.set(key, doc)
+        return doc
+
+    def _read_into(self, response, extractor, content_type, stop_at):
+        """Stream the body into the extractor until it ends or a byte, text or time limit is hit"""
+        match = re.search(r'charset=["\']?([\w-]+)', content_type)
+        decoder = codecs.getincrementaldecoder(match.group(1) if match else 'utf-8')(errors='replace')
+
+        received = 0
+        for chunk in iter_body(response, self.CHUNK_BYTES):
+            received += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            if received >= self.max_page_bytes or extractor.full or time.monotonic() >= stop_at:
+                self.truncated += 1
+                break
+        else:
+            extractor.feed(decoder.decode(b'', final=True))
+        extractor.close()
+
+    def _fetch_shared(self, url, deadline):
+        """Fetch a page, sharing the download with concurrent searches for the same URL"""
+        return self.flight.do(url, self.fetch_page, url, deadline)
+
+    def fetch_pages(self, urls):
+        """Fetch pages concurrently, returning the documents that arrived before the deadline"""
+        deadline = time.monotonic() + self.deadline
+        futures = [self.executor.submit(self._fetch_shared, url, deadline) for url in urls]
+        done, pending = wait(futures, timeout=self.deadline)
+        for future in pending:
+            future.cancel()
+
+        documents = []
+        for future in futures:
+            if future in done and future.exception() is None and future.result():
+                documents.append(future.result())
+        return documents
+
+    def find_passages(self, query, search_results):
+        """Get the most query-relevant passages of the top results, keyed by result link
+
+        Passages are picked by score until the character budget is spent, with
+        at most max_passages_per_page from any one page, and are returned in
+        page order.
+        """
+        urls = []
+        for result in search_results:
+            link = result.get('link')
+            if is_fetchable_url(link) and link not in urls:
+                urls.append(link)
+            if len(urls) >= self.top_k:
+                break
+        if not urls:
+            return {}
+
+        started = time.monotonic()
+        documents = self.fetch_pages(urls)
+
+        passages = []
+        for doc_index, doc in enumerate(documents):
+            for text in split_passages(doc["blocks"], self.passage_chars):
+                passages.append((doc_index, text))
+
+        chosen = {}
+        used = 0
+        for score, doc_index, text in rank_passages(query, passages):
+            picked = chosen.setdefault(doc_index, [])
+            if len(picked) >= self.max_passages_per_page or used + len(text) > self.budget_chars:
+                continue
+            picked.append(text)
+            used += len(text)
+
+        # Restore reading order within each page
+        order = {entry: position for position, entry in enumerate(passages)}
+        selected = {}
+        for doc_index, texts in chosen.items():
+            if texts:
+                texts.sort(key=lambda text: order[(doc_index, text)])
+                selected[documents[doc_index]["url"]] = texts
+
+        print(f"[DeepSearch] {len(documents)}/{len(urls)} pages, {used} chars of passages in {time.monotonic() - started:.2f}s")
+        return selected
+
+    def get_stats(self):
+        """Get fetch counters and the document cache state"""
+        return {
+            "top_k": self.top_k,
+            "budget_chars": self.budget_chars,
+            "fetched": self.fetched,
+            "not_modified": self.not_modified,
+            "fresh_hits": self.fresh_hits,
+            "truncated": self.truncated,
+            "failures": self.failures,
+            "cache": self.cache.get_stats(),
+            "single_flight": self.flight.get_stats()
+        }
+
+
+# Global deep searcher instance
+deep_searcher = DeepSearcher()
+
+
+def get_deep_searcher():
+    """Get deep searcher instance"""
+    return deep_searcher
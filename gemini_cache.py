@@ -0,0 +1,193 @@
+"""
+Gemini Context Cache Module for Axio AI
+Registry of explicit Gemini context caches for long, stable prompt prefixes
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from context_window import count_tokens
+
+
+class GeminiCacheRegistry:
+    """Tracks Gemini cached-content handles keyed by model and system instruction"""
+
+    # Refresh handles this many seconds before the server-side TTL runs out
+    EXPIRY_MARGIN_SECONDS = 60
+
+    # After a failed create, don't retry the same prefix for this long
+    FAILURE_BACKOFF_SECONDS = 300
+
+    # Prefixes remembered for counting uses before a cache is worth creating
+    MAX_SEEN = 1000
+
+    def __init__(self, client=None, ttl_seconds=None, min_tokens=None, max_entries=None, min_uses=None):
+        self.client = client
+        self.ttl_seconds = ttl_seconds or int(os.getenv('GEMINI_CACHE_TTL', '3600'))
+        self.min_tokens = min_tokens or int(os.getenv('GEMINI_CACHE_MIN_TOKENS', '1024'))
+        self.max_entries = max_entries or int(os.getenv('GEMINI_CACHE_MAX_ENTRIES', '50'))
+        self.min_uses = min_uses or int(os.getenv('GEMINI_CACHE_MIN_USES', '2'))
+        self.enabled = os.getenv('GEMINI_CONTEXT_CACHE', 'True') == 'True'
+
+        self._entries = {}
+        self._seen = OrderedDict()
+        self._failures = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def set_client(self, client):
+        """Attach the Gemini client used to create caches"""
+        self.client = client
+
+    def _key(self, model, system_instruction):
+        """Build the registry key for a model and prompt prefix"""
+        digest = hashlib.sha256(f"{model}\n{system_instruction}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_or_create(self, model, system_instruction):
+        """Get a live cache handle for a system instruction, creating one if needed
+
+        Returns None when caching is disabled, the prefix is too short to be
+        cached, hasn't been used min_uses times yet, or the cache could not be
+        created. Waiting for a repeat keeps one-off prefixes from paying for
+        a create round trip and an hour of cache storage.
+        """
+        if not self.enabled or not self.client or not system_instruction:
+            return None
+
+        token_count = count_tokens(system_instruction)
+        if token_count < self.min_tokens:
+            return None
+
+        key = self._key(model, system_instruction)
+
+        with self._lock:
+            name = self._lookup(key)
+            if name:
+                return name
+            if self._failures.get(key, 0) > time.time():
+                return None
+            if not self._count_use(key):
+                return None
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread creates a given cache; others wait and reuse it
+        with key_lock:
+            with self._lock:
+                name = self._lookup(key)
+                if name:
+                    return name
+
+            try:
+                from google.genai import types
+
+                cache = self.client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        ttl=f"{self.ttl_seconds}s",
+                        display_name=f"axio-{key[:16]}"
+                    )
+                )
+            except Exception as e:
+                print(f"[WARNING] Gemini cache creation failed: {e}")
+                with self._lock:
+                    now = time.time()
+                    self._failures = {k: until for k, until in self._failures.items() if until > now}
+                    self._failures[key] = now + self.FAILURE_BACKOFF_SECONDS
+                    self._key_locks.pop(key, None)
+                return None
+
+            now = time.time()
+            with self._lock:
+                self._entries[key] = {
+                    "name": cache.name,
+                    "model": model,
+                    "tokens": token_count,
+                    "hits": 0,
+                    "created_at": now,
+                    "expires_at": now + self.ttl_seconds - self.EXPIRY_MARGIN_SECONDS
+                }
+                self._failures.pop(key, None)
+                self._seen.pop(key, None)
+                # Later callers find the entry, so the creation lock can go
+                self._key_locks.pop(key, None)
+                evicted = self._evict_overflow()
+
+            print(f"[Gemini] Created context cache {cache.name} ({token_count} tokens)")
+            self._delete_remote(evicted)
+            return cache.name
+
+    def _count_use(self, key):
+        """Count a use of a prefix; True once it has been used min_uses times (caller holds the lock)"""
+        uses = self._seen.pop(key, 0) + 1
+        self._seen[key] = uses
+        while len(self._seen) > self.MAX_SEEN:
+            self._seen.popitem(last=False)
+        return uses >= self.min_uses
+
+    def _lookup(self, key):
+        """Get a live cache name for a key (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        if entry["expires_at"] <= time.time():
+            del self._entries[key]
+            return None
+        entry["hits"] += 1
+        return entry["name"]
+
+    def _evict_overflow(self):
+        """Drop the soonest-expiring entries beyond max_entries (caller holds the lock)"""
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            key = min(self._entries, key=lambda k: self._entries[k]["expires_at"])
+            evicted.append(self._entries.pop(key)["name"])
+        return evicted
+
+    def _delete_remote(self, names):
+        """Best-effort deletion of server-side caches"""
+        for name in names:
+            try:
+                self.client.caches.delete(name=name)
+            except Exception as e:
+                print(f"[WARNING] Gemini cache delete failed for {name}: {e}")
+
+    def invalidate(self, name):
+        """Forget a cache handle, e.g. after the server reports it missing"""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry["name"] == name:
+                    del self._entries[key]
+
+    def get_stats(self):
+        """Get the live cache handles and their remaining TTLs"""
+        now = time.time()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "min_uses": self.min_uses,
+                "prefixes_seen": len(self._seen),
+                "entries": [
+                    {
+                        "name": entry["name"],
+                        "model": entry["model"],
+                        "tokens": entry["tokens"],
+                        "hits": entry["hits"],
+                        "expires_in": max(0, int(entry["expires_at"] - now))
+                    }
+                    for entry in self._entries.values()
+                ]
+            }
+
+
+# Global Gemini cache registry
+gemini_cache = GeminiCacheRegistry()
+
+
+def get_gemini_cache():
+    """Get Gemini cache registry instance"""
+    return gemini_cache
@@ -0,0 +1,108 @@
+"""
+HTTP Client Module for Axio AI
+Shared keep-alive connection pools for outbound LLM, search and TTS calls
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HTTPClient:
+    """Thread-safe pooled HTTP client with one keep-alive session per upstream host"""
+
+    # Status codes worth retrying for idempotent requests
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=None, max_retries=None, backoff_factor=None,
+                 connect_timeout=None, read_timeout=None):
+        self.pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', '20'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('HTTP_MAX_RETRIES', '2'))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv('HTTP_BACKOFF_FACTOR', '0.3'))
+        self.connect_timeout = connect_timeout or float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = read_timeout or float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _build_retry(self):
+        """Build the retry policy shared by all pools
+
+        Connection failures are retried for every method since the request
+        never reached the server. Read errors are not retried, and status-based
+        retries only apply to idempotent methods so an LLM POST is never sent twice.
+        """
+        return Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            backoff_factor=self.backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+
+    def _build_session(self):
+        """Create a session with a keep-alive connection pool"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=self._build_retry(),
+            pool_block=False
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url):
+        """Get the shared session for the host of a URL"""
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}"
+
+        session = self._sessions.get(host_key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                session = self._build_session()
+                self._sessions[host_key] = session
+            return session
+
+    def _resolve_timeout(self, timeout):
+        """Expand a single read timeout into a (connect, read) tuple"""
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, (int, float)):
+            return (min(self.connect_timeout, timeout), timeout)
+        return timeout
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request through the pooled session for the target host"""
+        session = self.session_for(url)
+        return session.request(method, url, timeout=self._resolve_timeout(timeout), **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a pooled GET request"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a pooled POST request"""
+        return self.request('POST', url, **kwargs)
+
+
+# Global HTTP client instance
+http_client = HTTPClient()
+
+
+def get_http_client():
+    """Get HTTP client instance"""
+    return http_client
@@ -0,0 +1,191 @@
+"""
+LLM Job Queue Module for Axio AI
+Bounded background job queue and worker pool for long-running LLM requests
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class Job:
+    """A unit of LLM work tracked from submission to completion"""
+
+    def __init__(self, kind, fn, args, kwargs):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.result = None
+        self.status_code = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._changed = threading.Condition()
+        self._version = 0
+
+    def _set_status(self, status):
+        """Update the status and wake up subscribers"""
+        with self._changed:
+            self.status = status
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the job changes after a known version; returns the new version"""
+        with self._changed:
+            if self._version == version and not self.is_finished():
+                self._changed.wait(timeout)
+            return self._version
+
+    def is_finished(self):
+        """Check whether the job has completed or failed"""
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        """Get a JSON-serializable view of the job"""
+        now = time.time()
+        started = self.started_at or now
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "wait_time": round(started - self.created_at, 3),
+            "run_time": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None
+        }
+        if self.status == "done":
+            data["result"] = self.result
+            data["status_code"] = self.status_code
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Bounded FIFO job queue served by a fixed pool of worker threads"""
+
+    def __init__(self, workers=None, max_queue=None, retention_seconds=None):
+        self.workers = workers or int(os.getenv('LLM_JOB_WORKERS', '4'))
+        self.max_queue = max_queue or int(os.getenv('LLM_JOB_QUEUE_SIZE', '32'))
+        self.retention_seconds = retention_seconds or int(os.getenv('LLM_JOB_RETENTION', '600'))
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._recent_waits = deque(maxlen=200)
+
+    def _ensure_started(self):
+        """Start the worker threads on first use"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"llm-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, fn, *args, kind="llm", **kwargs):
+        """Queue a job; returns None if the queue is full
+
+        fn must return a (payload, status_code) tuple, which becomes the result.
+        """
+        self._ensure_started()
+        self._prune()
+
+        job = Job(kind, fn, args, kwargs)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self._rejected += 1
+            print(f"[Jobs] Queue full, rejected {kind} job")
+            return None
+
+        return job
+
+    def get(self, job_id):
+        """Get a job by id"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        """Run queued jobs until the process exits"""
+        while True:
+            job = self._queue.get()
+            job.started_at = time.time()
+            with self._lock:
+                self._running += 1
+                self._recent_waits.append(job.started_at - job.created_at)
+            job._set_status("running")
+
+            try:
+                payload, status_code = job._fn(*job._args, **job._kwargs)
+                job.result = payload
+                job.status_code = status_code
+                job.finished_at = time.time()
+                with self._lock:
+                    self._completed += 1
+                job._set_status("done")
+            except Exception as e:
+                print(f"[ERROR] {job.kind} job {job.id} failed: {e}")
+                job.error = str(e)
+                job.finished_at = time.time()
+                with self._lock:
+                    self._failed += 1
+                job._set_status("failed")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                # Drop references to request data once the job is finished
+                job._fn = job._args = job._kwargs = None
+                self._queue.task_done()
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def get_stats(self):
+        """Get queue depth, worker utilisation and recent wait times"""
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "workers": self.workers,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_time": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait_time": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0
+            }
+
+
+# Global LLM job queue
+llm_jobs = JobQueue()
+
+
+def get_job_queue():
+    """Get LLM job queue instance"""
+    return llm_jobs
@@ -0,0 +1,245 @@
+"""
+LLM Router Module for Axio AI
+Hedged and failover requests across the available AI backends
+"""
+
+import threading
+import time
+
+# Routing policies
+POLICY_SINGLE = 'single'
+POLICY_FAILOVER = 'failover'
+POLICY_HEDGED = 'hedged'
+
+
+class BackendBusyError(Exception):
+    """Raised when no backend slot could be obtained for the primary model"""
+
+
+class StreamHandle:
+    """Lets another thread abort a backend stream
+
+    The code opening a stream registers a callback with on_close() for each
+    resource it holds (an HTTP response, a host reservation); close() runs
+    them, so a read blocked on the connection fails instead of waiting for
+    the next chunk. Callbacks registered after close() run straight away.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def on_close(self, callback):
+        """Register a callback that releases a resource of the stream"""
+        with self._lock:
+            if not self.closed:
+                self._callbacks.append(callback)
+                return
+        self._run(callback)
+
+    def close(self):
+        """Run the registered callbacks once"""
+        with self._lock:
+            self.closed = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run(callback)
+
+    @staticmethod
+    def _run(callback):
+        try:
+            callback()
+        except Exception:
+            pass
+
+
+class ModelAttempt:
+    """One backend request streaming into a buffer on a background thread"""
+
+    def __init__(self, model, open_stream, on_finish, changed):
+        self.model = model
+        self.chunks = []
+        self.error = None
+        self.finished = False
+        self.started_at = time.time()
+        self.handle = StreamHandle()
+
+        self._open_stream = open_stream
+        self._on_finish = on_finish
+        self._finish_lock = threading.Lock()
+        self._changed = changed
+        self._cancelled = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name=f"llm-attempt-{model}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Pull chunks from the backend until done, failed or cancelled"""
+        stream = None
+        try:
+            stream = self._open_stream(self.handle)
+            for chunk in stream:
+                if self._cancelled.is_set():
+                    break
+                with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            # Closing the stream drops the upstream connection, which stops generation
+            close = getattr(stream, 'close', None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+            self._release()
+            with self._changed:
+                self.finished = True
+                self._changed.notify_all()
+
+    def _release(self):
+        """Give back the backend slot, once, whether cancelled or finished"""
+        if self._finish_lock.acquire(blocking=False):
+            self._on_finish()
+
+    def cancel(self):
+        """Stop relaying chunks, abort the backend connection and free the slot
+
+        Backends that register nothing on the handle stop at their next chunk.
+        """
+        self._cancelled.set()
+        self.handle.close()
+        self._release()
+
+    def succeeded(self):
+        """Check whether the attempt completed without error"""
+        return self.finished and self.error is None
+
+
+class RoutedRequest:
+    """Runs a request on a primary backend, hedging or failing over to a fallback
+
+    With the hedged policy, if the primary has not produced its first token
+    within hedge_delay seconds, the same request is sent to the fallback
+    backend and the first one to answer wins; the loser is cancelled. With
+    either the hedged or failover policy, a primary that errors out before
+    answering is retried on the fallback.
+    """
+
+    def __init__(self, primary, fallback, open_stream, acquire, release,
+                 policy=POLICY_HEDGED, hedge_delay=8.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.open_stream = open_stream
+        self.acquire = acquire
+        self.release = release
+        self.policy = policy
+        self.hedge_delay = hedge_delay
+
+        self.attempts = []
+        self._fallback_started = False
+        self._changed = threading.Condition()
+
+    def _start(self, model, blocking):
+        """Start an attempt once a backend slot is available; None if no slot"""
+        if not self.acquire(model, blocking):
+            return None
+        attempt = ModelAttempt(
+            model,
+            lambda handle: self.open_stream(model, handle),
+            lambda: self.release(model),
+            self._changed
+        )
+        with self._changed:
+            self.attempts.append(attempt)
+        return attempt
+
+    def _winner(self, commit_on_first_token):
+        """Get the attempt that has won the race (caller holds the lock)"""
+        for attempt in self.attempts:
+            if attempt.succeeded() or (commit_on_first_token and attempt.chunks):
+                return attempt
+        return None
+
+    def _race(self, commit_on_first_token):
+        """Wait until an attempt wins, starting the fallback when the policy calls for it
+
+        Returns the winning attempt, or raises the primary's error if every
+        attempt failed.
+        """
+        primary = self._start(self.primary, blocking=True)
+        if primary is None:
+            raise BackendBusyError(self.primary)
+
+        hedge_at = primary.started_at + self.hedge_delay if self.policy == POLICY_HEDGED else None
+
+        while True:
+            action = None
+            with self._changed:
+                winner = self._winner(commit_on_first_token)
+                if winner:
+                    break
+
+                if all(attempt.finished for attempt in self.attempts):
+                    if self._fallback_started or not self.fallback:
+                        raise primary.error
+                    action = 'failover'
+                elif hedge_at and not self._fallback_started and not primary.chunks:
+                    remaining = hedge_at - time.time()
+                    if remaining <= 0:
+                        action = 'hedge'
+                    else:
+                        self._changed.wait(remaining)
+                else:
+                    self._changed.wait()
+
+            if action:
+                self._fallback_started = True
+                if action == 'failover':
+                    print(f"[Router] {self.primary} failed ({primary.error}), failing over to {self.fallback}")
+                    if self._start(self.fallback, blocking=True) is None:
+                        raise primary.error
+                else:
+                    print(f"[Router] No first token from {self.primary} after {self.hedge_delay:.1f}s, hedging to {self.fallback}")
+                    self._start(self.fallback, blocking=False)
+
+        for attempt in self.attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+        if winner.model != self.primary:
+            print(f"[Router] {winner.model} answered first")
+        return winner
+
+    def result(self):
+        """Get (model, text) from whichever backend finishes first"""
+        winner = self._race(commit_on_first_token=False)
+        return winner.model, "".join(winner.chunks)
+
+    def stream(self):
+        """Yield (model, chunk) pairs from whichever backend produces a token first"""
+        winner = self._race(commit_on_first_token=True)
+
+        position = 0
+        try:
+            while True:
+                with self._changed:
+                    while position >= len(winner.chunks) and not winner.finished:
+                        self._changed.wait()
+                    new_chunks = winner.chunks[position:]
+                    position = len(winner.chunks)
+                    finished = winner.finished
+
+                for chunk in new_chunks:
+                    yield winner.model, chunk
+
+                if finished:
+                    if winner.error is not None:
+                        raise winner.error
+                    return
+        finally:
+            # Stop generating if the client went away mid-stream
+            winner.cancel()
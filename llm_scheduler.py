@@ -0,0 +1,174 @@
+"""
+LLM Scheduler Module for Axio AI
+Priority-aware admission control with per-session fairness and per-backend concurrency limits
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DOCIQ = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_DOCIQ: 'dociq',
+    PRIORITY_BATCH: 'batch'
+}
+
+
+class _Waiter:
+    """A request waiting for a backend slot"""
+
+    def __init__(self, session_key):
+        self.session_key = session_key
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued_at = time.time()
+
+
+class _Backend:
+    """Scheduling state for one backend"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.granted = 0
+        self.timed_out = 0
+        # priority -> session key -> queue of waiters, rotated round-robin
+        self.waiting = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+
+
+class LLMScheduler:
+    """Admits LLM calls by priority class, round-robin across sessions within a class"""
+
+    def __init__(self, limits=None, queue_timeout=None):
+        self.limits = limits or {
+            'gpt': int(os.getenv('LLM_CONCURRENCY_GPT', '2')),
+            'gemini': int(os.getenv('LLM_CONCURRENCY_GEMINI', '8'))
+        }
+        self.default_limit = int(os.getenv('LLM_CONCURRENCY_DEFAULT', '4'))
+        self.queue_timeout = queue_timeout or float(os.getenv('LLM_QUEUE_TIMEOUT', '120'))
+
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def _backend(self, name):
+        """Get the state for a backend (caller holds the lock)"""
+        backend = self._backends.get(name)
+        if backend is None:
+            backend = _Backend(self.limits.get(name, self.default_limit))
+            self._backends[name] = backend
+        return backend
+
+    def _dispatch(self, backend):
+        """Grant free slots to the next waiters (caller holds the lock)"""
+        while backend.active < backend.limit:
+            waiter = self._next_waiter(backend)
+            if waiter is None:
+                return
+            backend.active += 1
+            backend.granted += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _next_waiter(self, backend):
+        """Pop the next waiter: highest priority first, then the next session in turn"""
+        for priority in sorted(backend.waiting):
+            sessions = backend.waiting[priority]
+            if not sessions:
+                continue
+
+            session_key, waiters = next(iter(sessions.items()))
+            waiter = waiters.popleft()
+
+            # Rotate this session to the back so other sessions get a turn
+            del sessions[session_key]
+            if waiters:
+                sessions[session_key] = waiters
+            return waiter
+        return None
+
+    def set_limit(self, backend_name, limit):
+        """Change the concurrency limit of a backend"""
+        with self._lock:
+            self.limits[backend_name] = limit
+            backend = self._backend(backend_name)
+            backend.limit = limit
+            self._dispatch(backend)
+
+    def acquire(self, backend_name, priority=PRIORITY_INTERACTIVE, session_key=None, timeout=None):
+        """Wait for a slot on a backend; returns False if the wait timed out"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        waiter = _Waiter(session_key)
+
+        with self._lock:
+            backend = self._backend(backend_name)
+            backend.waiting[priority].setdefault(session_key, deque()).append(waiter)
+            self._dispatch(backend)
+
+        if waiter.event.wait(timeout):
+            return True
+
+        with self._lock:
+            # The slot may have been granted just as the wait timed out
+            if waiter.granted:
+                return True
+
+            sessions = backend.waiting[priority]
+            waiters = sessions.get(session_key)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del sessions[session_key]
+            backend.timed_out += 1
+
+        print(f"[Scheduler] {PRIORITY_NAMES[priority]} request timed out waiting for {backend_name}")
+        return False
+
+    def release(self, backend_name):
+        """Free a slot on a backend and hand it to the next waiter"""
+        with self._lock:
+            backend = self._backend(backend_name)
+            backend.active = max(0, backend.active - 1)
+            self._dispatch(backend)
+
+    @contextmanager
+    def slot(self, backend_name, priority=PRIORITY_INTERACTIVE, session_key=None, timeout=None):
+        """Hold a backend slot for the duration of a with-block; yields whether it was granted"""
+        granted = self.acquire(backend_name, priority, session_key, timeout)
+        try:
+            yield granted
+        finally:
+            if granted:
+                self.release(backend_name)
+
+    def get_stats(self):
+        """Get active and waiting request counts per backend"""
+        with self._lock:
+            return {
+                name: {
+                    "limit": backend.limit,
+                    "active": backend.active,
+                    "granted": backend.granted,
+                    "timed_out": backend.timed_out,
+                    "waiting": {
+                        PRIORITY_NAMES[priority]: sum(len(waiters) for waiters in sessions.values())
+                        for priority, sessions in backend.waiting.items()
+                    }
+                }
+                for name, backend in self._backends.items()
+            }
+
+
+# Global LLM scheduler
+llm_scheduler = LLMScheduler()
+
+
+def get_llm_scheduler():
+    """Get LLM scheduler instance"""
+    return llm_scheduler
@@ -0,0 +1,264 @@
+"""
+Ollama Pool Module for Axio AI
+Least-outstanding-requests load balancing across Ollama hosts with health probing, session affinity and model warm-up
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+class OllamaNode:
+    """One Ollama host and its routing state"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.url = url
+        self.base_url = f"{parts.scheme}://{parts.netloc}"
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.last_error = None
+        self.last_probe = None
+        self.models = []
+        self.model_loaded = False
+        self.warming = False
+        self.warmed_at = None
+        self.warmup_attempted_at = 0
+        self.warmup_seconds = None
+
+    def is_available(self, now):
+        """Check whether the node can take new requests"""
+        return self.healthy and self.ejected_until <= now
+
+    def to_dict(self, now):
+        """Get a JSON-serializable view of the node"""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected_for": max(0, int(self.ejected_until - now)),
+            "outstanding": self.outstanding,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe,
+            "models": self.models,
+            "model_loaded": self.model_loaded,
+            "warming": self.warming,
+            "warmed_at": self.warmed_at,
+            "warmup_seconds": self.warmup_seconds
+        }
+
+
+class OllamaPool:
+    """Routes Ollama requests to the host with the fewest outstanding requests"""
+
+    # Keep at most this many session-to-host affinity entries
+    MAX_AFFINITY_ENTRIES = 10000
+
+    def __init__(self, urls, http_client, probe_interval=None, eject_seconds=None,
+                 max_failures=None, affinity_slack=None, rewarm_interval=None):
+        self.nodes = [OllamaNode(url) for url in urls]
+        self.http_client = http_client
+        self.probe_interval = probe_interval or float(os.getenv('OLLAMA_PROBE_INTERVAL', '15'))
+        self.eject_seconds = eject_seconds or float(os.getenv('OLLAMA_EJECT_SECONDS', '30'))
+        self.max_failures = max_failures or int(os.getenv('OLLAMA_MAX_FAILURES', '3'))
+        self.affinity_slack = affinity_slack if affinity_slack is not None else int(os.getenv('OLLAMA_AFFINITY_SLACK', '2'))
+        self.rewarm_interval = rewarm_interval or float(os.getenv('OLLAMA_REWARM_INTERVAL', '60'))
+
+        # Chat payload used to load the model on each host, set by enable_warmup()
+        self.warmup_payload = None
+        self.warmup_timeout = None
+
+        self._affinity = OrderedDict()
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    def pick(self, session_key=None, exclude=None):
+        """Choose a node for a request (caller must call acquire/release around use)
+
+        Sessions stick to the host that served them last so its KV cache stays
+        warm, unless that host is unavailable or has noticeably more requests in
+        flight than the least-loaded host.
+        """
+        self._ensure_probing()
+        now = time.time()
+        exclude = exclude or ()
+
+        with self._lock:
+            candidates = [node for node in self.nodes if node.is_available(now) and node not in exclude]
+            if not candidates:
+                # Fail open: try the host that comes back soonest rather than nothing
+                candidates = [node for node in self.nodes if node not in exclude] or self.nodes
+                candidates = [min(candidates, key=lambda node: node.ejected_until)]
+
+            least_loaded = min(candidates, key=lambda node: (node.outstanding, node.total_requests))
+
+            node = least_loaded
+            if session_key is not None:
+                sticky = self._affinity.get(session_key)
+                if sticky in candidates and sticky.outstanding <= least_loaded.outstanding + self.affinity_slack:
+                    node = sticky
+
+                self._affinity[session_key] = node
+                self._affinity.move_to_end(session_key)
+                while len(self._affinity) > self.MAX_AFFINITY_ENTRIES:
+                    self._affinity.popitem(last=False)
+
+            node.outstanding += 1
+            node.total_requests += 1
+            return node
+
+    def release(self, node):
+        """Mark a request on a node as finished"""
+        with self._lock:
+            node.outstanding = max(0, node.outstanding - 1)
+
+    def report_success(self, node):
+        """Record a successful request"""
+        with self._lock:
+            node.consecutive_failures = 0
+            node.healthy = True
+
+    def report_failure(self, node, error):
+        """Record a failed request, ejecting the node after repeated failures"""
+        with self._lock:
+            node.consecutive_failures += 1
+            node.total_failures += 1
+            node.last_error = str(error)[:200]
+            if node.consecutive_failures >= self.max_failures and len(self.nodes) > 1:
+                node.ejected_until = time.time() + self.eject_seconds
+                print(f"[Ollama] Ejected {node.base_url} for {self.eject_seconds:.0f}s after {node.consecutive_failures} failures")
+
+    def enable_warmup(self, payload, timeout=300):
+        """Load the model on every host now and again whenever a host has unloaded it
+
+        payload is a tiny chat request for the model; its keep_alive keeps the
+        model resident between requests.
+        """
+        self.warmup_payload = payload
+        self.warmup_timeout = timeout
+        for node in self.nodes:
+            self._start_warmup(node)
+        self._ensure_probing()
+
+    def _start_warmup(self, node):
+        """Warm a node on a background thread unless a warm-up is already running"""
+        with self._lock:
+            if node.warming or not self.warmup_payload:
+                return
+            node.warming = True
+            node.warmup_attempted_at = time.time()
+        threading.Thread(target=self.warm_up, args=(node,), name="ollama-warmup", daemon=True).start()
+
+    def warm_up(self, node):
+        """Send the warm-up request to a node and record whether the model loaded"""
+        model = self.warmup_payload.get("model")
+        started = time.time()
+        try:
+            response = self.http_client.post(node.url, json=self.warmup_payload, timeout=self.warmup_timeout)
+            response.raise_for_status()
+            elapsed = time.time() - started
+            with self._lock:
+                node.model_loaded = True
+                node.warmed_at = time.time()
+                node.warmup_seconds = round(elapsed, 2)
+            print(f"[Ollama] {model} warmed up on {node.base_url} in {elapsed:.1f}s")
+        except Exception as e:
+            with self._lock:
+                node.last_error = str(e)[:200]
+            print(f"[Ollama] Warm-up of {model} failed on {node.base_url}: {e}")
+        finally:
+            with self._lock:
+                node.warming = False
+
+    def _is_model_running(self, node):
+        """Check /api/ps for the warm-up model; None if the host can't tell us"""
+        model = self.warmup_payload.get("model", "")
+        if model.endswith("-cloud"):
+            # Cloud models run remotely and never show up as resident
+            return None
+        try:
+            response = self.http_client.get(f"{node.base_url}/api/ps", timeout=5)
+            response.raise_for_status()
+        except Exception:
+            return None
+
+        names = {name for running in response.json().get('models', [])
+                 for name in (running.get('name'), running.get('model')) if name}
+        return model in names or f"{model}:latest" in names
+
+    def is_ready(self):
+        """Check whether at least one available host has the model loaded"""
+        now = time.time()
+        with self._lock:
+            return any(node.is_available(now) and node.model_loaded for node in self.nodes)
+
+    def probe(self):
+        """Check every node's /api/tags endpoint and update its health
+
+        With warm-up enabled, hosts that have unloaded the model (restart,
+        keep_alive expiry, memory pressure) are warmed again.
+        """
+        for node in self.nodes:
+            try:
+                response = self.http_client.get(f"{node.base_url}/api/tags", timeout=5)
+                response.raise_for_status()
+                models = [model.get('name') for model in response.json().get('models', [])]
+                with self._lock:
+                    was_down = not node.healthy or node.ejected_until > time.time()
+                    node.healthy = True
+                    node.ejected_until = 0
+                    node.consecutive_failures = 0
+                    node.models = models
+                    node.last_probe = time.time()
+                if was_down:
+                    print(f"[Ollama] {node.base_url} is healthy again")
+
+                if self.warmup_payload:
+                    running = self._is_model_running(node)
+                    if running is not None:
+                        with self._lock:
+                            node.model_loaded = running
+                    # Don't hammer a host that keeps dropping the model
+                    if not node.model_loaded and node.warmup_attempted_at + self.rewarm_interval <= time.time():
+                        self._start_warmup(node)
+            except Exception as e:
+                with self._lock:
+                    if node.healthy:
+                        print(f"[Ollama] Health probe failed for {node.base_url}: {e}")
+                    node.healthy = False
+                    node.model_loaded = False
+                    node.last_error = str(e)[:200]
+                    node.last_probe = time.time()
+
+    def _ensure_probing(self):
+        """Start the background health probe thread on first use"""
+        if self._probe_thread is not None:
+            return
+        with self._lock:
+            if self._probe_thread is not None:
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="ollama-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Probe all nodes periodically"""
+        while True:
+            self.probe()
+            time.sleep(self.probe_interval)
+
+    def get_stats(self):
+        """Get routing state for every node"""
+        now = time.time()
+        with self._lock:
+            return {
+                "warmup_enabled": self.warmup_payload is not None,
+                "nodes": [node.to_dict(now) for node in self.nodes],
+                "sessions_tracked": len(self._affinity)
+            }
@@ -0,0 +1,179 @@
+"""
+Provider Health Module for Axio AI
+Success rate, latency EWMA and circuit breakers for upstream providers such as search backends
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+# Circuit breaker states
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class ProviderState:
+    """Rolling health of one provider"""
+
+    def __init__(self, name, window):
+        self.name = name
+        self.outcomes = deque(maxlen=window)
+        self.latency_ewma = None
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0
+        self.cooldown = 0
+        self.trial_in_flight = False
+        self.total_calls = 0
+        self.total_failures = 0
+        self.last_error = None
+
+    def success_rate(self):
+        """Get the share of recent calls that succeeded (1.0 with no history)"""
+        if not self.outcomes:
+            return 1.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def to_dict(self, now):
+        """Get a JSON-serializable view of the provider"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "success_rate": round(self.success_rate(), 3),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "recent_calls": len(self.outcomes),
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": max(0, int(self.open_until - now)) if self.state == CIRCUIT_OPEN else 0,
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "last_error": self.last_error
+        }
+
+
+class ProviderHealthRegistry:
+    """Tracks provider health and decides which providers may be called
+
+    A provider's circuit opens after max_failures consecutive failures and
+    stays open for a cooldown that doubles on every failed trial, up to
+    max_cooldown. Once the cooldown has passed the circuit is half-open: one
+    trial call is let through, and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, max_failures=None, cooldown=None, max_cooldown=None, window=None, ewma_alpha=0.3):
+        self.max_failures = max_failures or int(os.getenv('SEARCH_BREAKER_FAILURES', '3'))
+        self.base_cooldown = cooldown or float(os.getenv('SEARCH_BREAKER_COOLDOWN', '60'))
+        self.max_cooldown = max_cooldown or float(os.getenv('SEARCH_BREAKER_MAX_COOLDOWN', '900'))
+        self.window = window or int(os.getenv('SEARCH_HEALTH_WINDOW', '20'))
+        self.ewma_alpha = ewma_alpha
+
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def _state(self, name):
+        """Get the state of a provider (caller holds the lock)"""
+        state = self._providers.get(name)
+        if state is None:
+            state = self._providers[name] = ProviderState(name, self.window)
+        return state
+
+    def _allow(self, state, now):
+        """Check whether a call may go to a provider, claiming the trial slot (caller holds the lock)"""
+        if state.state == CIRCUIT_CLOSED:
+            return True
+        if state.state == CIRCUIT_OPEN:
+            if now < state.open_until:
+                return False
+            state.state = CIRCUIT_HALF_OPEN
+            print(f"[Health] {state.name} circuit half-open, sending a trial request")
+        if state.trial_in_flight:
+            return False
+        state.trial_in_flight = True
+        return True
+
+    def select(self, names):
+        """Get the providers that may be called now, healthiest first
+
+        Providers are ranked by recent success rate and then latency (rounded,
+        so jitter doesn't reorder them), keeping the given order as the
+        tie-break. If every circuit is open, the provider that comes back
+        soonest is returned so the caller is never left with nothing.
+        """
+        now = time.time()
+        with self._lock:
+            states = [self._state(name) for name in names]
+            allowed = [state for state in states if self._allow(state, now)]
+
+            if not allowed and states:
+                fallback = min(states, key=lambda state: state.open_until)
+                allowed = [fallback]
+
+            ranked = sorted(
+                allowed,
+                key=lambda state: (
+                    state.state != CIRCUIT_CLOSED,
+                    -round(state.success_rate(), 1),
+                    round(state.latency_ewma or 0),
+                    names.index(state.name)
+                )
+            )
+            return [state.name for state in ranked]
+
+    def record(self, name, success, latency, error=None):
+        """Record the outcome of a call"""
+        with self._lock:
+            state = self._state(name)
+            state.total_calls += 1
+            state.outcomes.append(1 if success else 0)
+            if state.latency_ewma is None:
+                state.latency_ewma = latency
+            else:
+                state.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * state.latency_ewma
+
+            was_trial = state.state == CIRCUIT_HALF_OPEN
+            state.trial_in_flight = False
+
+            if success:
+                state.consecutive_failures = 0
+                if state.state != CIRCUIT_CLOSED:
+                    print(f"[Health] {name} circuit closed")
+                state.state = CIRCUIT_CLOSED
+                state.cooldown = 0
+                return
+
+            state.total_failures += 1
+            state.consecutive_failures += 1
+            state.last_error = str(error)[:200] if error else "no results"
+
+            # A straggler that failed after the circuit opened doesn't extend it
+            if state.state == CIRCUIT_OPEN:
+                return
+
+            if was_trial or state.consecutive_failures >= self.max_failures:
+                state.cooldown = min(self.max_cooldown, state.cooldown * 2 if was_trial else self.base_cooldown)
+                state.open_until = time.time() + state.cooldown
+                state.state = CIRCUIT_OPEN
+                print(f"[Health] {name} circuit open for {state.cooldown:.0f}s after {state.consecutive_failures} failures")
+
+    def cancel(self, name):
+        """Give back a trial slot claimed by select() for a call that never ran"""
+        with self._lock:
+            state = self._state(name)
+            if state.state == CIRCUIT_HALF_OPEN:
+                state.trial_in_flight = False
+
+    def get_stats(self):
+        """Get the health of every provider"""
+        now = time.time()
+        with self._lock:
+            return {name: state.to_dict(now) for name, state in self._providers.items()}
+
+
+# Global health registry for web search providers
+search_health = ProviderHealthRegistry()
+
+
+def get_search_health():
+    """Get search provider health registry instance"""
+    return search_health
@@ -0,0 +1,99 @@
+"""
+Rate Limiter Module for Axio AI
+Thread-safe token buckets for pacing calls to rate-limited upstream providers
+"""
+
+import threading
+import time
+
+
+def parse_rate(spec):
+    """Parse a 'rate:burst' spec (tokens per second, bucket size) into a tuple"""
+    rate, _, burst = str(spec).partition(':')
+    return float(rate), int(burst or 1)
+
+
+class TokenBucket:
+    """Token bucket refilled at a fixed rate up to a burst size"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.granted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add the tokens earned since the last update (caller holds the lock)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self):
+        """Take a token if one is available; never waits"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.granted += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def wait_time(self):
+        """Get the seconds until a token is available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1 or self.rate <= 0:
+                return 0.0 if self.tokens >= 1 else float('inf')
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout):
+        """Wait up to timeout seconds for a token; returns whether one was taken"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.try_acquire():
+                return True
+            delay = self.wait_time()
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+    def get_stats(self):
+        """Get the bucket's configuration and counters"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "granted": self.granted,
+                "rejected": self.rejected
+            }
+
+
+class RateLimiterRegistry:
+    """Named token buckets; names without a configured limit are unlimited"""
+
+    def __init__(self, limits=None):
+        self._buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in (limits or {}).items()}
+
+    def try_acquire(self, name):
+        """Take a token for a name without waiting"""
+        bucket = self._buckets.get(name)
+        return bucket.try_acquire() if bucket else True
+
+    def wait_time(self, name):
+        """Get the seconds until a name has a token"""
+        bucket = self._buckets.get(name)
+        return bucket.wait_time() if bucket else 0.0
+
+    def acquire(self, name, timeout):
+        """Wait up to timeout seconds for a token for a name"""
+        bucket = self._buckets.get(name)
+        return bucket.acquire(timeout) if bucket else True
+
+    def get_stats(self):
+        """Get every bucket's state"""
+        return {name: bucket.get_stats() for name, bucket in self._buckets.items()}
@@ -0,0 +1,75 @@
+"""
+Request Trace Module for Axio AI
+Timed stages of a request, including stages that run concurrently on other threads
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class RequestTrace:
+    """Collects the wall-clock span of every stage of one request
+
+    Stages may run on different threads. The time saved by running them
+    concurrently is the sum of the stage durations minus the time during
+    which at least one stage was running. Waits for another stage to finish
+    are shown but don't count as work.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, waiting=False):
+        """Time the enclosed block as a stage, or as a wait for one when waiting is set"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.spans.append((stage, start - self.started, end - self.started, waiting))
+
+    def wrap(self, stage, fn):
+        """Get a version of fn that is timed as a stage, for handing to another thread"""
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            with self.span(stage):
+                return fn(*args, **kwargs)
+        return timed
+
+    def to_dict(self):
+        """Get the stage timings and the time saved by overlapping them, in milliseconds"""
+        total = time.perf_counter() - self.started
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span[1])
+
+        work = [(start, end) for _, start, end, waiting in spans if not waiting]
+        busy = 0.0
+        covered_until = 0.0
+        for start, end in work:
+            if end > covered_until:
+                busy += end - max(start, covered_until)
+                covered_until = end
+        stage_total = sum(end - start for start, end in work)
+
+        return {
+            "total_ms": round(total * 1000, 1),
+            "saved_ms": round((stage_total - busy) * 1000, 1),
+            "stages": [
+                {"stage": stage, "start_ms": round(start * 1000, 1), "ms": round((end - start) * 1000, 1), "waiting": waiting}
+                for stage, start, end, waiting in spans
+            ]
+        }
+
+    def log(self):
+        """Print the trace on one line and return it as a dict"""
+        data = self.to_dict()
+        stages = ", ".join(f"{s['stage']} {s['ms']:.0f}ms@{s['start_ms']:.0f}" for s in data["stages"])
+        print(f"[Trace] {self.name} {data['total_ms']:.0f}ms, {data['saved_ms']:.0f}ms saved by overlap: {stages}")
+        return data
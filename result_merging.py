@@ -0,0 +1,147 @@
+"""
+Result Merging Module for Axio AI
+URL canonicalization, near-duplicate detection and rank fusion for web search results
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = frozenset([
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref_src', 'ref_url', 'srsltid', 'spm', 'cmpid', 'ved', 'usg'
+])
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'oly_')
+
+# Redirect wrappers used by search engines: (host suffix, path, parameter with the target)
+REDIRECTS = [
+    ('duckduckgo.com', '/l/', 'uddg'),
+    ('google.com', '/url', 'q'),
+    ('google.com', '/url', 'url'),
+    ('bing.com', '/ck/a', 'u')
+]
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def unwrap_redirect(url):
+    """Get the target of a search engine redirect link, or the URL itself"""
+    for _ in range(3):
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        # Relative redirect links (/url?q=...) come from scraped result pages
+        relative = not parts.netloc
+        target = None
+        for suffix, path, param in REDIRECTS:
+            if (relative or host == suffix or host.endswith('.' + suffix)) and parts.path == path:
+                target = dict(parse_qsl(parts.query)).get(param)
+                if target:
+                    break
+        if not target or not target.startswith(('http://', 'https://')):
+            return url
+        url = target
+    return url
+
+
+def canonicalize_url(url):
+    """Get a clean form of a result URL: redirect unwrapped, tracking parameters and fragment removed"""
+    url = unwrap_redirect(url.strip())
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        return url
+
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+    return urlunsplit((parts.scheme.lower(), host, parts.path or '/', urlencode(query), ''))
+
+
+def url_key(url):
+    """Get the identity of a canonical URL, ignoring scheme, www., trailing slash and parameter order"""
+    parts = urlsplit(url)
+    host = (parts.netloc or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    query = "&".join(sorted(parts.query.split('&'))) if parts.query else ''
+    return f"{host}{path}?{query}"
+
+
+def simhash(text, bits=64):
+    """Get the SimHash fingerprint of a text from its words
+
+    Texts that share most of their words get fingerprints a few bits apart,
+    so small edits (truncation, punctuation, a date prefix) don't hide a
+    duplicate the way an exact hash would. Snippets are short, so single
+    words are steadier features than word pairs: copies of one snippet land
+    within about 10 of 64 bits, different articles on the topic 18 or more.
+    """
+    weights = [0] * bits
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming_distance(a, b):
+    """Count the bits that differ between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+class _Cluster:
+    """One unique result and the copies of it found across providers"""
+
+    def __init__(self, result, fingerprint, order):
+        self.result = result
+        self.fingerprint = fingerprint
+        self.order = order
+        self.score = 0.0
+
+
+def merge_results(result_sets, limit=5, rrf_k=60, max_distance=10, min_tokens=8):
+    """Fuse ranked result lists into the top unique results
+
+    Links are canonicalized first. Results whose link matches, or whose
+    title and snippet are near-duplicates (SimHash within max_distance
+    bits, for texts of at least min_tokens words), are treated as one.
+    Each result scores 1 / (rrf_k + rank) for every list it appears in
+    (reciprocal rank fusion), so results several providers agree on rise.
+    Ties keep the order of first appearance, i.e. the preferred provider.
+    """
+    clusters = []
+    by_key = {}
+
+    for results in result_sets:
+        seen_in_set = set()
+        for rank, result in enumerate(results or [], 1):
+            link = canonicalize_url(result.get('link', ''))
+            if not link.startswith('http'):
+                continue
+            key = url_key(link)
+            text = f"{result.get('title', '')} {result.get('snippet', '')}"
+            fingerprint = simhash(text) if len(TOKEN_PATTERN.findall(text)) >= min_tokens else None
+
+            cluster = by_key.get(key)
+            if cluster is None and fingerprint is not None:
+                cluster = next((c for c in clusters if c.fingerprint is not None
+                                and hamming_distance(c.fingerprint, fingerprint) <= max_distance), None)
+            if cluster is None:
+                cluster = _Cluster(dict(result, link=link), fingerprint, len(clusters))
+                clusters.append(cluster)
+            elif len(result.get('snippet') or '') > len(cluster.result.get('snippet') or ''):
+                # Keep the first link and title, but the most informative snippet
+                cluster.result['snippet'] = result['snippet']
+            by_key[key] = cluster
+
+            # A provider listing the same article twice only counts once
+            if id(cluster) in seen_in_set:
+                continue
+            seen_in_set.add(id(cluster))
+            cluster.score += 1.0 / (rrf_k + rank)
+
+    ranked = sorted(clusters, key=lambda c: (-c.score, c.order))
+    return [c.result for c in ranked[:limit]]
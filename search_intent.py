@@ -0,0 +1,198 @@
+"""
+Search Intent Module for Axio AI
+Weighted phrase rules, compiled into one matcher, that decide whether a chat message needs a web search
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+def rule(name, pattern, weight, start=False, word=True):
+    """Build a rule; start rules only match at the start of the message, word rules only whole words"""
+    return {"name": name, "pattern": pattern, "weight": weight, "start": start, "word": word}
+
+
+def default_rules():
+    """Get the built-in rules
+
+    Positive weights point to a search and negative ones away from it; a
+    message searches when its total reaches the threshold (1.0 by default).
+    Where two rules could match the same words, the one listed first wins,
+    so longer phrases come before their prefixes. {year}, {last_year} and
+    {next_year} in a pattern stand for the current year and its neighbours.
+    """
+    return [
+        # Explicit requests to search
+        rule('explicit', r'search (the web|online|the internet|for)|web search|google (it|this|for)|look ?up', 4.0),
+        rule('search_word', r'search|google', 1.0),
+        # Questions about things that change
+        rule('fresh', r'latest|news|today|tonight|current(ly)?|trending|recent(ly)?|right now|live score', 1.0),
+        rule('market', r'prices?|stock( price)?s?|exchange rates?|weather|forecast', 1.0),
+        rule('recent_year', r'{last_year}|{year}|{next_year}', 1.0),
+        rule('release', r'release date|released|new version|updates?', 0.5),
+        # Factual lookups
+        rule('about', r'tell me about|information (about|on)|who (is|was|are)|when (did|was|is)|where is', 1.0),
+        rule('definition', r'definition of|meaning of|what is|what are', 1.0),
+        rule('how_to', r'how to|how do i|how can i', 1.0),
+        rule('find', r'find', 0.5),
+        rule('online', r'online|internet|website', 0.5),
+        # Work on text or code the user supplies needs no search
+        rule('own_code', r'(this|my|the following|attached|above|below) (code|function|script|snippet|error|query|class|program|file|text|paragraph|essay|email)', -2.0),
+        rule('explain_this', r'(explain|what does|what is wrong with) (this|that|it)', -1.5),
+        rule('code_task', r'debug|refactor|rewrite|optimi[sz]e|fix|implement|unit tests?|compile|syntax', -1.0),
+        rule('text_task', r'translate|summari[sz]e|paraphrase|proofread|rephrase|grammar', -1.0),
+        rule('code_block', r'```|traceback \(|\w+error: |\bdef \w+\(|\bfunction \w*\(', -2.0, word=False),
+        rule('creative', r'write (a|an|me a) (poem|story|song|essay|joke|letter)', -1.0),
+        rule('chit_chat', r'hi|hello|hey|thanks|thank you', -0.5, start=True)
+    ]
+
+
+def load_rules(path):
+    """Load rules from a JSON file (a list of rule dicts like rule() builds), or the built-in rules without one"""
+    if not path:
+        return default_rules()
+    try:
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        for entry in rules:
+            re.compile(entry['pattern'])
+            float(entry['weight'])
+        return rules
+    except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+        print(f"[WARNING] Could not load search intent rules from {path}: {e}; using built-in rules")
+        return default_rules()
+
+
+class SearchIntentClassifier:
+    """Scores messages against weighted rules in a single regex pass
+
+    Every rule becomes a named group of one alternation, so a message is
+    scanned once however many rules there are; each rule counts once per
+    message. Decisions are cached per normalized message and, when a log
+    path is set, appended as JSON lines for offline tuning.
+    """
+
+    def __init__(self, rules=None, threshold=None, log_path=None, cache_size=None):
+        self.rules = rules or load_rules(os.getenv('SEARCH_INTENT_RULES', ''))
+        self.threshold = threshold if threshold is not None else float(os.getenv('SEARCH_INTENT_THRESHOLD', '1.0'))
+        self.log_path = log_path if log_path is not None else os.getenv('SEARCH_INTENT_LOG', '')
+        self.cache_size = cache_size or int(os.getenv('SEARCH_INTENT_CACHE_SIZE', '2048'))
+
+        self._year = datetime.now().year
+        self._pattern = self._compile(self.rules, self._year)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+        self.decisions = 0
+        self.searches = 0
+        self.cache_hits = 0
+        self.rule_hits = {rule['name']: 0 for rule in self.rules}
+
+    @staticmethod
+    def _compile(rules, year):
+        """Compile the rules for a year into one alternation with a named group per rule"""
+        parts = []
+        for index, rule in enumerate(rules):
+            pattern = (rule['pattern'].replace('{last_year}', str(year - 1))
+                       .replace('{next_year}', str(year + 1)).replace('{year}', str(year)))
+            pattern = f"(?:{pattern})"
+            if rule.get('word', True):
+                pattern = rf"(?<!\w){pattern}(?!\w)"
+            if rule.get('start'):
+                pattern = f"^{pattern}"
+            parts.append(f"(?P<r{index}>{pattern})")
+        return re.compile('|'.join(parts))
+
+    def classify(self, message):
+        """Get the decision for a message: whether to search, the score and the rules that matched"""
+        text = " ".join(message.lower().split())
+
+        with self._lock:
+            # Year rules move on at New Year, and decisions made with the old ones go
+            year = datetime.now().year
+            if year != self._year:
+                self._year = year
+                self._pattern = self._compile(self.rules, year)
+                self._cache.clear()
+            pattern = self._pattern
+            self.decisions += 1
+            decision = self._cache.get(text)
+            if decision is not None:
+                self._cache.move_to_end(text)
+                self.cache_hits += 1
+                if decision['search']:
+                    self.searches += 1
+
+        if decision is not None:
+            self._log(message, decision, cached=True)
+            return decision
+
+        matched = []
+        for match in pattern.finditer(text):
+            index = int(match.lastgroup[1:])
+            if index not in matched:
+                matched.append(index)
+
+        score = sum(float(self.rules[index]['weight']) for index in matched)
+        decision = {
+            "search": score >= self.threshold,
+            "score": round(score, 2),
+            "rules": [self.rules[index]['name'] for index in matched]
+        }
+
+        with self._lock:
+            if decision['search']:
+                self.searches += 1
+            for name in decision['rules']:
+                self.rule_hits[name] = self.rule_hits.get(name, 0) + 1
+            self._cache[text] = decision
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        self._log(message, decision)
+        return decision
+
+    def _log(self, message, decision, cached=False):
+        """Print a decision and append it to the decision log, if one is set"""
+        print(f"[Intent] search={decision['search']} score={decision['score']} rules={decision['rules']}{' (cached)' if cached else ''}")
+        if not self.log_path:
+            return
+        line = json.dumps({
+            "time": round(time.time(), 3),
+            "message": message[:500],
+            "cached": cached,
+            **decision
+        }, ensure_ascii=False)
+        try:
+            with self._log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"[WARNING] Could not write search intent log: {e}")
+
+    def get_stats(self):
+        """Get decision counters and how often each rule matched"""
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "rules": len(self.rules),
+                "decisions": self.decisions,
+                "searches": self.searches,
+                "cache_hits": self.cache_hits,
+                "cached_messages": len(self._cache),
+                "rule_hits": dict(self.rule_hits)
+            }
+
+
+# Global search intent classifier
+search_intent = SearchIntentClassifier()
+
+
+def get_search_intent():
+    """Get search intent classifier instance"""
+    return search_intent
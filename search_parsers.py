@@ -0,0 +1,189 @@
+"""
+Search Parsers Module for Axio AI
+Result page parsing for the scraping search providers, with a selectable HTML parser backend
+"""
+
+import os
+import re
+import urllib.parse
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional; it parses several times faster than the pure-Python html.parser
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+PARSER_BACKENDS = ('lxml', 'html.parser')
+
+
+def class_token(name):
+    """Match a class attribute containing name as one of its classes
+
+    Strainers see the raw attribute string while parsing, and newer bs4
+    releases no longer split it into classes there, so a plain class_ filter
+    would miss elements with several classes.
+    """
+    return re.compile(rf'(^|\s){re.escape(name)}(\s|$)')
+
+
+# Result blocks of each page. Only these are built into a tree when parsing is
+# strained; the rest of the page is tokenized and thrown away.
+DUCKDUCKGO_RESULTS = SoupStrainer('div', attrs={'class': class_token('result')})
+GOOGLE_RESULTS = SoupStrainer('div', attrs={'class': class_token('g')})
+GOOGLE_FALLBACK_RESULTS = SoupStrainer('div', attrs={'data-hveid': True})
+
+# Opening tag of a DuckDuckGo result block, used to cut the page short
+DUCKDUCKGO_BLOCK_START = re.compile(r'<div class="result[\s"]')
+
+
+def resolve_parser_backend(name=None):
+    """Get the parser backend to use: 'auto' picks lxml when it is installed"""
+    name = (name or os.getenv('SEARCH_PARSER', 'auto')).lower()
+    if name == 'auto':
+        return 'lxml' if LXML_AVAILABLE else 'html.parser'
+    if name not in PARSER_BACKENDS:
+        print(f"[WARNING] Unknown SEARCH_PARSER '{name}', using html.parser")
+        return 'html.parser'
+    if name == 'lxml' and not LXML_AVAILABLE:
+        print("[WARNING] SEARCH_PARSER=lxml but lxml is not installed, using html.parser")
+        return 'html.parser'
+    return name
+
+
+class ResultPageParser:
+    """Extracts title, snippet and link of each result from search result pages"""
+
+    def __init__(self, backend=None, strained=None):
+        self.backend = resolve_parser_backend(backend)
+        if strained is None:
+            strained = os.getenv('SEARCH_PARSER_STRAINED', 'True') == 'True'
+        self.strained = strained
+
+    # When strained, DuckDuckGo pages are cut after this many blocks per
+    # wanted result (spare blocks cover ads and results without a link)
+    BLOCKS_PER_RESULT = 2
+
+    def _soup(self, html, strainer):
+        """Parse a page, keeping only the elements the strainer matches when strained"""
+        return BeautifulSoup(html, self.backend, parse_only=strainer if self.strained else None)
+
+    def _truncate(self, html, block_start, blocks):
+        """Cut the markup where block number blocks + 1 starts, if there is one
+
+        Results come in page order, so blocks past the ones that can be used
+        don't need to be tokenized at all.
+        """
+        for index, match in enumerate(block_start.finditer(html)):
+            if index == blocks:
+                return html[:match.start()]
+        return html
+
+    def parse_duckduckgo(self, html, limit=5):
+        """Parse a DuckDuckGo HTML results page"""
+        if self.strained:
+            html = self._truncate(html, DUCKDUCKGO_BLOCK_START, limit * self.BLOCKS_PER_RESULT)
+        soup = self._soup(html, DUCKDUCKGO_RESULTS)
+        results = []
+
+        for result in soup.find_all('div', class_='result')[:limit]:
+            title_elem = result.find('a', class_='result__a')
+            snippet_elem = result.find('a', class_='result__snippet')
+
+            if title_elem:
+                title = title_elem.get_text(strip=True)
+                link = title_elem.get('href', '')
+
+                # Clean DuckDuckGo redirect URL
+                if 'uddg=' in link:
+                    link = urllib.parse.unquote(link.split('uddg=')[1].split('&')[0])
+
+                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
+
+                if title and link and link.startswith('http'):
+                    results.append({
+                        'title': title,
+                        'snippet': snippet,
+                        'link': link
+                    })
+
+        return results
+
+    def parse_google(self, html, limit=5):
+        """Parse a Google results page
+
+        Result blocks are the div.g elements; when Google's markup has none,
+        the page is parsed again for the div[data-hveid] blocks instead.
+        """
+        search_divs = self._soup(html, GOOGLE_RESULTS).find_all('div', class_='g')
+
+        # Alternative selector if 'g' class doesn't work
+        if not search_divs:
+            search_divs = self._soup(html, GOOGLE_FALLBACK_RESULTS).select('div[data-hveid]')
+
+        results = []
+        for div in search_divs[:limit]:
+            try:
+                result = self._parse_google_block(div)
+            except Exception:
+                continue
+            if result:
+                results.append(result)
+        return results
+
+    def _parse_google_block(self, div):
+        """Extract one result from a Google result block; None if it isn't one"""
+        # Get title - try multiple selectors
+        title_elem = div.find('h3') or div.find('h2') or div.select_one('[role="heading"]')
+        title = title_elem.get_text(strip=True) if title_elem else ''
+
+        # Get link
+        link_elem = div.find('a', href=True)
+        link = link_elem.get('href', '') if link_elem else ''
+
+        # Clean the link
+        if link.startswith('/url?q='):
+            link = link.split('/url?q=')[1].split('&')[0]
+            link = urllib.parse.unquote(link)
+        elif link.startswith('/search'):
+            return None  # Skip internal Google links
+
+        # Skip if not a valid URL
+        if not link.startswith('http'):
+            return None
+
+        # Get snippet - try multiple selectors
+        snippet_elem = (
+            div.find('div', class_='VwiC3b') or
+            div.find('span', class_='aCOpRe') or
+            div.select_one('[data-sncf]') or
+            div.find('div', {'style': lambda x: x and 'line-clamp' in str(x)})
+        )
+        snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
+
+        if title and link:
+            return {
+                'title': title,
+                'snippet': snippet,
+                'link': link
+            }
+        return None
+
+    def get_stats(self):
+        """Get the parser configuration"""
+        return {
+            "backend": self.backend,
+            "strained": self.strained,
+            "lxml_available": LXML_AVAILABLE
+        }
+
+
+# Global result page parser
+search_parser = ResultPageParser()
+
+
+def get_search_parser():
+    """Get search result page parser instance"""
+    return search_parser
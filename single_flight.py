@@ -0,0 +1,76 @@
+"""
+Single Flight Module for Axio AI
+Collapses concurrent identical calls into one upstream request
+"""
+
+import threading
+
+
+class _Call:
+    """An in-flight call and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; duplicate callers share its result
+
+    The first caller for a key (the leader) runs the function. Callers that
+    arrive with the same key while it is running wait for it and get the
+    same result, or the same exception. Results are not kept once the call
+    finishes; caching is left to the caller.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), or wait for an identical in-flight call"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                print(f"[SingleFlight] {self.name}: shared one call with {call.waiters} waiting caller(s)")
+            call.done.set()
+
+    def get_stats(self):
+        """Get the number of upstream calls and of callers that shared one"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced
+            }
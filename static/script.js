@@ -416,6 +416,8 @@ class AxioAssistant {
 
                     if (lastUserMsg) {
                         lastUserMsg.dataset.index = data.user_index;
+                        // Stored messages are edited by id; positions shift as old turns are summarized
+                        if (data.user_id) lastUserMsg.dataset.messageId = data.user_id;
 
                         // Add edit button now that we have the index
                         const content = lastUserMsg.querySelector('.message-content');
@@ -632,7 +634,7 @@ class AxioAssistant {
             const response = await fetch('/api/chat/edit', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ index: messageIndex, content: newText })
+                body: JSON.stringify({ index: messageIndex, message_id: messageDiv.dataset.messageId || null, content: newText })
             });
 
             const data = await response.json();
@@ -658,6 +660,10 @@ class AxioAssistant {
             textDiv.textContent = newText;
 
             editContainer.replaceWith(textDiv);
+            if (data.user_index !== undefined && data.user_index !== null) {
+                index = data.user_index;
+                messageDiv.dataset.index = index;
+            }
             if (actionsDiv) {
                 actionsDiv.style.display = 'flex';
                 // Update onclick handler with new text
@@ -0,0 +1,152 @@
+"""
+Usage Metrics Module for Axio AI
+Token counts, generation speed and cost of LLM calls, per model and per session
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+
+
+def ollama_usage(data):
+    """Extract token counts and timings from an Ollama response (durations are in ns)"""
+    return {
+        "prompt_tokens": data.get("prompt_eval_count", 0),
+        "completion_tokens": data.get("eval_count", 0),
+        "prompt_seconds": round(data.get("prompt_eval_duration", 0) / 1e9, 3),
+        "generation_seconds": round(data.get("eval_duration", 0) / 1e9, 3),
+        "load_seconds": round(data.get("load_duration", 0) / 1e9, 3)
+    }
+
+
+def gemini_usage(usage_metadata):
+    """Extract token counts from Gemini usage metadata"""
+    if usage_metadata is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None) or 0,
+        "completion_tokens": getattr(usage_metadata, "candidates_token_count", None) or 0,
+        "cached_tokens": getattr(usage_metadata, "cached_content_token_count", None) or 0
+    }
+
+
+class _Totals:
+    """Running totals for a model or a session"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.generation_seconds = 0.0
+        self.cost = 0.0
+
+    def add(self, usage):
+        """Add one call's usage"""
+        self.calls += 1
+        # Cached and coalesced calls cost nothing; count them but not their time
+        if usage.get("cache_hit"):
+            self.cache_hits += 1
+            return
+        if usage.get("coalesced"):
+            self.coalesced += 1
+            return
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.generation_seconds += usage.get("generation_seconds") or usage.get("total_seconds", 0)
+        self.cost += usage.get("cost", 0.0)
+
+    def to_dict(self):
+        """Get a JSON-serializable view of the totals"""
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_second": round(self.completion_tokens / self.generation_seconds, 2) if self.generation_seconds else 0.0,
+            "cost": round(self.cost, 6)
+        }
+
+
+class UsageTracker:
+    """Aggregates LLM usage per model and per session in memory"""
+
+    def __init__(self, prices=None, max_sessions=None, recent_calls=None):
+        # USD per million prompt/completion tokens
+        self.prices = prices or {
+            'gpt': (float(os.getenv('LLM_COST_GPT_INPUT', '0')), float(os.getenv('LLM_COST_GPT_OUTPUT', '0'))),
+            'gemini': (float(os.getenv('LLM_COST_GEMINI_INPUT', '0.30')), float(os.getenv('LLM_COST_GEMINI_OUTPUT', '2.50')))
+        }
+        self.max_sessions = max_sessions or int(os.getenv('USAGE_MAX_SESSIONS', '1000'))
+
+        self._models = {}
+        self._sessions = OrderedDict()
+        self._recent_tps = {}
+        self._recent_calls = recent_calls or 200
+        self._lock = threading.Lock()
+
+    def finalize(self, usage, model, backend_model, elapsed):
+        """Fill in derived fields (speed, cost, wall time) of a call's usage"""
+        usage["model"] = model
+        usage["backend_model"] = backend_model
+        usage["total_seconds"] = round(elapsed, 3)
+
+        if usage.get("cache_hit") or usage.get("coalesced"):
+            usage["cost"] = 0.0
+            return usage
+
+        completion = usage.get("completion_tokens", 0)
+        generation_seconds = usage.get("generation_seconds") or elapsed
+        usage["tokens_per_second"] = round(completion / generation_seconds, 2) if generation_seconds else 0.0
+
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        usage["cost"] = round((usage.get("prompt_tokens", 0) * input_price + completion * output_price) / 1e6, 6)
+        return usage
+
+    def record(self, session_key, usage):
+        """Add a finalized call to the model and session totals"""
+        model = usage.get("model", "unknown")
+        with self._lock:
+            self._models.setdefault(model, _Totals()).add(usage)
+            if usage.get("tokens_per_second"):
+                self._recent_tps.setdefault(model, deque(maxlen=self._recent_calls)).append(usage["tokens_per_second"])
+
+            if session_key:
+                totals = self._sessions.get(session_key)
+                if totals is None:
+                    totals = self._sessions[session_key] = _Totals()
+                    while len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                self._sessions.move_to_end(session_key)
+                totals.add(usage)
+
+    def get_session_stats(self, session_key):
+        """Get usage totals for one session since the process started"""
+        with self._lock:
+            totals = self._sessions.get(session_key)
+            return totals.to_dict() if totals else _Totals().to_dict()
+
+    def get_model_stats(self):
+        """Get usage totals and recent generation speed per model"""
+        with self._lock:
+            stats = {}
+            for model, totals in self._models.items():
+                data = totals.to_dict()
+                recent = sorted(self._recent_tps.get(model, ()))
+                data["recent_tokens_per_second_p50"] = recent[len(recent) // 2] if recent else 0.0
+                stats[model] = data
+            return {
+                "models": stats,
+                "sessions_tracked": len(self._sessions)
+            }
+
+
+# Global usage tracker
+usage_tracker = UsageTracker()
+
+
+def get_usage_tracker():
+    """Get usage tracker instance"""
+    return usage_tracker